@@ -0,0 +1,136 @@
+"""Compare how the WSGI and ASGI servers cope with slow clients holding connections open.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_asgi --clients 200 --delay 2 --workers 2
+
+Slow clients connect at a steady rate over ``--duration`` seconds and each
+trickles the body of its /filter request over ``--delay`` seconds, the way
+a poor mobile link would.  Meanwhile a fast client keeps asking for
+/api/cache.  A sync gunicorn worker is stuck reading one slow body at a
+time, so everything queued behind it waits; the ASGI server waits on all
+of them at once and keeps answering the fast client straight away.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_serialization import load
+from benchmarks.load_serve import HOST, wait_for
+from hermes import create_app
+from hermes.extensions import db
+
+CHUNKS = 10
+
+
+async def request(port: int, method: str, path: str, body: bytes = b"", delay: float = 0) -> float:
+    """Make one request, sending the body in pieces spread over `delay` seconds, and return the seconds it took."""
+    started = time.monotonic()
+    reader, writer = await asyncio.open_connection(HOST, port)
+    head = (
+        f"{method} {path} HTTP/1.1\r\nHost: {HOST}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+    )
+    writer.write(head.encode())
+    size = max(-(-len(body) // CHUNKS), 1)
+    for offset in range(0, len(body), size):
+        await asyncio.sleep(delay / CHUNKS)
+        writer.write(body[offset : offset + size])
+        await writer.drain()
+    status = await reader.readline()
+    await reader.read()
+    writer.close()
+    if b" 200 " not in status:
+        raise RuntimeError(f"{path} answered {status!r}")
+    return time.monotonic() - started
+
+
+async def scenario(port: int, clients: int, delay: float, duration: float, body: bytes) -> tuple[list, list]:
+    async def slow(number: int) -> float:
+        await asyncio.sleep(duration * number / clients)
+        return await request(port, "POST", "/filter", body, delay)
+
+    async def fast() -> list[float]:
+        latencies = []
+        stop = time.monotonic() + duration
+        while time.monotonic() < stop:
+            latencies.append(await request(port, "GET", "/api/cache"))
+            await asyncio.sleep(0.05)
+        return latencies
+
+    *slow_latencies, fast_latencies = await asyncio.gather(*(slow(number) for number in range(clients)), fast())
+    return slow_latencies, fast_latencies
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return sorted(values)[max(int(len(values) * fraction) - 1, 0)]
+
+
+def measure(command: list[str], uri: str, port: int, args, station_ids: list[int]) -> dict:
+    env = {**os.environ, "SQLALCHEMY_DATABASE_URI": uri}
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    body = json.dumps({"start_day": "Mon", "start_time": "0000", "end_time": "0600", "station_ids": station_ids})
+    try:
+        wait_for(port, server)
+        started = time.monotonic()
+        slow_latencies, fast_latencies = asyncio.run(
+            scenario(port, args.clients, args.delay, args.duration, body.encode())
+        )
+        elapsed = time.monotonic() - started
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "elapsed": elapsed,
+        "slow_p50": statistics.median(slow_latencies),
+        "fast_requests": len(fast_latencies),
+        "fast_p50": statistics.median(fast_latencies),
+        "fast_p99": percentile(fast_latencies, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stations", type=int, default=20, help="Synthetic stations to load.")
+    parser.add_argument("--clients", type=int, default=200, help="Slow clients to send.")
+    parser.add_argument("--delay", type=float, default=2, help="Seconds each slow client takes to send its body.")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds over which the slow clients arrive.")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes for both servers.")
+    parser.add_argument("--port", type=int, default=8891)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        uri = f"sqlite:///{Path(directory) / 'hermes.sqlite'}"
+        app = create_app({"SQLALCHEMY_DATABASE_URI": uri})
+        with app.app_context():
+            db.create_all()
+            load(args.stations)
+            db.engine.dispose()
+        station_ids = list(range(1, args.stations + 1))
+
+        wsgi = f"-m flask --app hermes serve --bind {HOST}:{args.port} --workers {args.workers} --threads 1"
+        asgi = f"-m uvicorn --factory hermes.asgi:create_asgi_app --host {HOST} --port {args.port} --workers {args.workers}"
+        servers = {
+            "WSGI (flask serve)": [sys.executable, *wsgi.split()],
+            "ASGI (uvicorn)": [sys.executable, *asgi.split(), "--log-level", "warning"],
+        }
+        print(f"{args.clients} slow clients over {args.duration}s, {args.delay}s each, {args.workers} workers")
+        for name, command in servers.items():
+            result = measure(command, uri, args.port, args, station_ids)
+            print(
+                f"  {name:<20} {result['elapsed']:6.1f} s  slow p50 {result['slow_p50']:6.2f} s"
+                f"  fast: {result['fast_requests']:4} done, p50 {result['fast_p50'] * 1000:7.1f} ms"
+                f"  p99 {result['fast_p99'] * 1000:7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
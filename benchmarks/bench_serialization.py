@@ -0,0 +1,73 @@
+"""Compare marshmallow + stdlib json against the precompiled serializers + orjson on a large schedule.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_serialization --stations 200
+"""
+
+import argparse
+import json
+from datetime import date
+from timeit import repeat
+
+from sqlalchemy.orm import selectinload
+
+from hermes import create_app, schemas
+from hermes.commands import insert_schedule, insert_stations, prepare_schedule, prepare_station, synthetic_schedule
+from hermes.extensions import db
+from hermes.models import Frequency, Station, Transmission
+
+SCHEDULE_DATE = date(2024, 11, 20)
+
+
+def synthetic(stations: int) -> dict:
+    """The synthetic schedule of ``stations`` stations every benchmark uses, as `flask generate-schedule` writes it."""
+    return synthetic_schedule("synthetic", SCHEDULE_DATE, stations, frequencies=8, transmissions=30, seed=0)
+
+
+def load(stations: int) -> None:
+    """Insert the synthetic schedule of ``stations`` stations."""
+    schedule_data = synthetic(stations)
+    stations = [prepare_station(station_data) for station_data in schedule_data["stations"]]
+    stats = {}
+    insert_stations(insert_schedule(prepare_schedule(schedule_data), stats), stations, stats)
+    db.session.commit()
+
+
+def best(func, number: int) -> float:
+    return min(repeat(func, number=number, repeat=5)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stations", type=int, default=200, help="Synthetic stations to load.")
+    parser.add_argument("--number", type=int, default=3, help="Dumps per timing run.")
+    args = parser.parse_args()
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    with app.app_context():
+        db.create_all()
+        load(args.stations)
+        rows = db.session.scalars(
+            db.select(Station).options(
+                selectinload(Station.frequencies).selectinload(Frequency.times),
+                selectinload(Station.transmissions).selectinload(Transmission.times),
+                selectinload(Station.map_areas),
+            )
+        ).all()
+        assert schemas.stations_serializer.dump(rows) == schemas.stations.dump(rows)
+
+        dumps = app.json.dumps
+        timings = {
+            "marshmallow + json": best(lambda: json.dumps(schemas.stations.dump(rows)), args.number),
+            "serializer + json": best(lambda: json.dumps(schemas.stations_serializer.dump(rows)), args.number),
+            "serializer + orjson": best(lambda: dumps(schemas.stations_serializer.dump(rows)), args.number),
+        }
+    baseline = timings["marshmallow + json"]
+    print(f"{len(rows)} stations")
+    for name, seconds in timings.items():
+        print(f"  {name:<20} {seconds * 1000:8.1f} ms  {baseline / seconds:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import pytest
+
+from benchmarks.bench_serialization import load
+from hermes import create_app
+from hermes.extensions import db
+
+
+@pytest.fixture(scope="session")
+def loaded_app():
+    """Returns an app whose in-memory database holds the synthetic schedule with the given number of stations."""
+    apps = {}
+
+    def loaded(stations: int):
+        if stations not in apps:
+            app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+            with app.app_context():
+                db.create_all()
+                load(stations)
+            apps[stations] = app
+        return apps[stations]
+
+    return loaded
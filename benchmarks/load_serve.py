@@ -0,0 +1,119 @@
+"""Measure /filter throughput from `flask serve` as the worker count grows.
+
+Run from the repository root:
+
+    python -m benchmarks.load_serve --stations 200 --workers 1 2 4 8
+
+Each worker count gets a fresh server with one thread per worker and the
+/filter cache turned off, so every request does the full query.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from itertools import count
+from pathlib import Path
+
+from benchmarks.bench_serialization import load
+from hermes import create_app
+from hermes.extensions import db
+
+HOST = "127.0.0.1"
+DAYS = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
+
+
+def wait_for(port: int, server: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with {server.returncode}")
+        try:
+            connection = HTTPConnection(HOST, port, timeout=1)
+            connection.request("GET", "/api/cache")
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def client(port: int, station_ids: list[int], stop: float) -> int:
+    """Post /filter for a rolling hour-long window until `stop`, returning the number of requests made."""
+    connection = HTTPConnection(HOST, port)
+    made = 0
+    for number in count():
+        if time.monotonic() >= stop:
+            break
+        hour = number % 23
+        body = json.dumps(
+            {
+                "start_day": DAYS[number % 7],
+                "start_time": f"{hour:02}00",
+                "end_time": f"{hour + 1:02}00",
+                "station_ids": station_ids,
+            }
+        )
+        connection.request("POST", "/filter", body, {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"/filter returned {response.status}")
+        made += 1
+    connection.close()
+    return made
+
+
+def run(uri: str, workers: int, port: int, concurrency: int, duration: float, station_ids: list[int]) -> float:
+    env = {**os.environ, "SQLALCHEMY_DATABASE_URI": uri, "FILTER_CACHE_SIZE": "0"}
+    command = [sys.executable, "-m", "flask", "--app", "hermes", "serve"]
+    server = subprocess.Popen(
+        [*command, "--bind", f"{HOST}:{port}", "--workers", str(workers), "--threads", "1"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(port, server)
+        stop = time.monotonic() + duration
+        with ThreadPoolExecutor(concurrency) as executor:
+            made = sum(executor.map(lambda _: client(port, station_ids, stop), range(concurrency)))
+    finally:
+        server.terminate()
+        server.wait()
+    return made / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stations", type=int, default=200, help="Synthetic stations to load.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to try.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent client connections.")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to load each server for.")
+    parser.add_argument("--port", type=int, default=8890)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        uri = f"sqlite:///{Path(directory) / 'hermes.sqlite'}"
+        app = create_app({"SQLALCHEMY_DATABASE_URI": uri})
+        with app.app_context():
+            db.create_all()
+            load(args.stations)
+            station_ids = list(range(1, args.stations + 1))
+            db.engine.dispose()
+
+        print(f"{args.stations} stations, {args.concurrency} clients, {os.cpu_count()} CPUs")
+        baseline = None
+        for workers in args.workers:
+            rate = run(uri, workers, args.port, args.concurrency, args.duration, station_ids)
+            baseline = baseline or rate
+            print(f"  {workers:>3} workers {rate:8.1f} req/s  {rate / baseline:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
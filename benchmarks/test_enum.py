@@ -0,0 +1,13 @@
+import pytest
+
+from hermes.enum import EmissionType, Enums, EnumSet
+
+VALUES = [EmissionType.A1A, EmissionType.J2B, EmissionType.J3E]
+
+
+@pytest.mark.parametrize("column_type", [Enums(EmissionType), EnumSet(EmissionType)], ids=["json", "bitmask"])
+def test_enum_round_trip(benchmark, column_type):
+    def round_trip():
+        return column_type.process_result_value(column_type.process_bind_param(VALUES, None), None)
+
+    assert benchmark(round_trip) == VALUES
@@ -0,0 +1,35 @@
+from datetime import time
+
+import pytest
+
+from hermes.enum import DayOfWeek
+from hermes.extensions import db
+from hermes.filter import DateTimeRange, get_events, load_stations, query_events
+from hermes.models import Station
+
+# crosses midnight, so both days are checked
+WINDOW = DateTimeRange(DayOfWeek.Mon, time(22, 0), time(2, 0))
+
+
+@pytest.mark.parametrize("stations", [10, 100, 1000])
+def test_get_events(benchmark, loaded_app, stations):
+    with loaded_app(stations).app_context():
+        stations = load_stations()
+        assert benchmark(get_events, WINDOW, stations)
+
+
+@pytest.mark.parametrize("stations", [10, 100, 1000])
+def test_query_events(benchmark, loaded_app, stations):
+    with loaded_app(stations).app_context():
+        assert benchmark(query_events, WINDOW)
+
+
+def test_get_frequencies_at_time(benchmark, loaded_app):
+    with loaded_app(10).app_context():
+        station = db.session.get(Station, 1)
+        assert benchmark(station.get_frequencies_at_time, time(23, 0))
+
+
+def test_in_range(benchmark):
+    checks = [(day, time(hour, 30)) for day in DayOfWeek for hour in range(24)]
+    assert any(benchmark(lambda: [WINDOW.in_range(day, check_time) for day, check_time in checks]))
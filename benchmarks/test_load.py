@@ -0,0 +1,27 @@
+import json
+
+import pytest
+
+from benchmarks.bench_serialization import synthetic
+from hermes import create_app
+from hermes.extensions import db
+
+
+@pytest.mark.parametrize("options", [[], ["--bulk"], ["--stream"]], ids=["orm", "bulk", "stream"])
+@pytest.mark.parametrize("stations", [100, 1000])
+def test_load_schedule(benchmark, tmp_path, stations, options):
+    schedule_path = tmp_path / "schedule.json"
+    schedule_path.write_text(json.dumps(synthetic(stations)))
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    runner = app.test_cli_runner()
+
+    def empty_database():
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+
+    def load_schedule():
+        result = runner.invoke(args=["load-schedule", *options, str(schedule_path)])
+        assert result.exit_code == 0, result.output
+
+    benchmark.pedantic(load_schedule, setup=empty_database, rounds=3)
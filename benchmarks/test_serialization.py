@@ -0,0 +1,24 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from hermes import schemas
+from hermes.extensions import db
+from hermes.models import Frequency, Schedule, Station, Transmission
+
+
+@pytest.mark.parametrize(
+    "dump", [schemas.schedule.dump, schemas.schedule_serializer.dump], ids=["marshmallow", "serializer"]
+)
+def test_schedule_dump(benchmark, loaded_app, dump):
+    with loaded_app(100).app_context():
+        schedule = db.session.scalars(
+            select(Schedule).options(
+                selectinload(Schedule.stations).options(
+                    selectinload(Station.frequencies).selectinload(Frequency.times),
+                    selectinload(Station.transmissions).selectinload(Transmission.times),
+                    selectinload(Station.map_areas),
+                )
+            )
+        ).one()
+        assert len(benchmark(dump, schedule)["stations"]) == 100
@@ -1,43 +1,78 @@
 import json
 import os
 from contextlib import suppress
+from functools import partial
 
 import click
 from flask import Flask
 from flask.cli import with_appcontext
 from sqlalchemy.exc import IntegrityError
 
-from hermes.extensions import db
+from hermes.cache import ResultCache
+from hermes.extensions import ORJSONProvider, db, engine_options, migrate, sqlite_pragmas, tune_sqlite
+from hermes.metrics import init_metrics, make_multiprocess_dir, record_cache_lookup
 from hermes.models import Frequency, MapArea, Schedule, Station, TimeList, TimeRange, Transmission
+from hermes.queries import init_query_detector
 from hermes.schemas import frequency as frequency_schema
 from hermes.schemas import map_area as map_area_schema
 from hermes.schemas import schedule as schedule_schema
 from hermes.schemas import station as station_schema
 from hermes.schemas import transmission as transmission_schema
+from hermes.snapshot import init_snapshot
 
 
 def create_app(test_config=None):
     app = Flask(__name__)
+    app.json = ORJSONProvider(app)
 
-    if test_config is None:
-        app.config.from_object("hermes.config.Config")
-    else:
+    app.config.from_object("hermes.config.Config")
+    if test_config is not None:
         app.config.from_mapping(test_config)
 
     # make sure instance path exists
     with suppress(OSError):
         os.makedirs(app.instance_path)
 
+    # cache lookups are counted whether or not /metrics is served
+    make_multiprocess_dir()
+
     # init extensions
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config))
+    if app.config["READ_ONLY_SNAPSHOT"]:
+        init_snapshot(app)
     db.init_app(app)
+    with app.app_context():
+        tune_sqlite(db.engine, sqlite_pragmas(app.config))
+    migrate.init_app(app, db)
+    app.extensions["hermes.filter_cache"] = ResultCache(
+        app.config["FILTER_CACHE_SIZE"],
+        app.config["FILTER_CACHE_TTL"],
+        on_lookup=partial(record_cache_lookup, "filter"),
+    )
+    if app.config["METRICS_ENABLED"]:
+        init_metrics(app)
+    if app.config["QUERY_DETECTOR"]:
+        init_query_detector(app)
 
     # add commands
-    from hermes.commands import init_db, load_schedule, make_arrl_schedule, make_wefax_schedule
+    from hermes.commands import (
+        compile_schedules,
+        generate_schedule,
+        init_db,
+        load_schedule,
+        make_arrl_schedule,
+        make_wefax_schedule,
+    )
 
+    app.cli.add_command(compile_schedules)
+    app.cli.add_command(generate_schedule)
     app.cli.add_command(init_db)
     app.cli.add_command(load_schedule)
     app.cli.add_command(make_arrl_schedule)
     app.cli.add_command(make_wefax_schedule)
+    from hermes.serve import serve
+
+    app.cli.add_command(serve)
 
     # now routes
     from hermes.routes import main_bp
@@ -0,0 +1,108 @@
+"""The parts of the read API that do not depend on the web framework, shared by `hermes.routes` and `hermes.asgi`."""
+
+from collections.abc import Callable, Hashable, Iterable, Sequence
+from datetime import datetime
+from typing import Any
+from urllib.parse import urlencode
+
+from werkzeug.datastructures import MIMEAccept, MultiDict
+from werkzeug.exceptions import BadRequest
+
+from hermes.cache import ResultCache
+from hermes.enum import DayOfWeek
+from hermes.extensions import time_format
+from hermes.filter import DateTimeRange, Event
+
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+
+
+def wants_ndjson(accept: MIMEAccept) -> bool:
+    return accept.best_match([JSON, NDJSON]) == NDJSON
+
+
+def data_etag(version: int, ndjson: bool) -> str:
+    """The ETag of a response built from this data version, which differs between JSON and NDJSON bodies."""
+    return f"{version}-ndjson" if ndjson else str(version)
+
+
+def enum_args(args: MultiDict, name: str, enum_type) -> list:
+    """Enum members named by a repeatable query argument, rejecting unknown names."""
+    try:
+        return [enum_type[value] for value in args.getlist(name)]
+    except KeyError as e:
+        raise BadRequest(f"Unknown {name} {e}") from None
+
+
+def page_bounds(args: MultiDict, config, ndjson: bool) -> tuple[int, int | None]:
+    """The keyset cursor and page size the query arguments ask for.
+
+    The size is None when every row after the cursor is to be streamed, with ``?stream=1`` or as NDJSON.
+    """
+    after = args.get("after", 0, type=int)
+    if ndjson or args.get("stream", 0, type=int):
+        return after, None
+    limit = args.get("limit", config["API_PAGE_SIZE"], type=int)
+    if limit < 1:
+        raise BadRequest("Limit must be positive")
+    return after, min(limit, config["API_MAX_PAGE_SIZE"])
+
+
+def keyset(query, model, after: int, limit: int):
+    """The next `limit` rows of a legacy or 2.0-style query after the cursor, ordered by id."""
+    return query.filter(model.id > after).order_by(model.id).limit(limit)
+
+
+def next_page_headers(path: str, args: MultiDict, rows: Sequence, limit: int) -> dict[str, str]:
+    """Headers linking to the next page, given one row more than the page holds when there is one."""
+    if len(rows) <= limit:
+        return {}
+    cursor = rows[limit - 1].id
+    next_args = urlencode({**args.to_dict(flat=False), "after": cursor, "limit": limit}, doseq=True)
+    return {"Link": f'<{path}?{next_args}>; rel="next"', "X-Next-Cursor": str(cursor)}
+
+
+class StreamEncoder:
+    """Render batches of rows as the pieces of one JSON array, or as NDJSON lines."""
+
+    def __init__(self, dumps: Callable[[Any], str], ndjson: bool):
+        self.dumps = dumps
+        self.ndjson = ndjson
+        self.mimetype = NDJSON if ndjson else JSON
+        self.started = False
+
+    def batch(self, items: Iterable) -> str:
+        if self.ndjson:
+            return "".join(self.dumps(item) + "\n" for item in items)
+        chunk = ("," if self.started else "[") + ",".join(self.dumps(item) for item in items)
+        self.started = True
+        return chunk
+
+    def end(self) -> str:
+        if self.ndjson:
+            return ""
+        return "]" if self.started else "[]"
+
+
+def filter_args(json_data: dict) -> tuple[DateTimeRange, list[int]]:
+    """The range and stations a /filter body asks for."""
+    start_day = DayOfWeek[json_data["start_day"]]
+    start_time = datetime.strptime(json_data["start_time"], time_format).time()
+    end_time = datetime.strptime(json_data["end_time"], time_format).time()
+    # the page sends the ids as the strings its checkboxes hold
+    try:
+        station_ids = [int(station_id) for station_id in json_data["station_ids"]]
+    except (TypeError, ValueError):
+        raise BadRequest("Station ids must be integers") from None
+    return DateTimeRange(day=start_day, start_time=start_time, end_time=end_time), station_ids
+
+
+def filter_key(dtr: DateTimeRange, station_ids: list[int]) -> Hashable:
+    return (dtr.day, dtr.start_time, dtr.end_time, frozenset(station_ids))
+
+
+def cache_events(cache: ResultCache, key: Hashable, version: int, events: list[Event]) -> list[dict]:
+    """Render the events and keep them for later requests with the same key and data version."""
+    rendered = [event.to_dict() for event in events]
+    cache.put(key, version, rendered)
+    return rendered
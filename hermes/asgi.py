@@ -0,0 +1,333 @@
+from collections.abc import Awaitable, Callable
+from contextlib import asynccontextmanager
+from functools import wraps
+
+from a2wsgi import WSGIMiddleware
+from flask import Flask
+from sqlalchemy import Select, func, select
+from sqlalchemy.engine import URL
+from sqlalchemy.exc import NoResultFound
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.datastructures import MIMEAccept, MultiDict
+from werkzeug.exceptions import BadRequest, HTTPException, NotFound
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag
+
+from hermes import create_app
+from hermes.api import (
+    StreamEncoder,
+    cache_events,
+    data_etag,
+    enum_args,
+    filter_args,
+    filter_key,
+    keyset,
+    next_page_headers,
+    page_bounds,
+    wants_ndjson,
+)
+from hermes.enum import DayOfWeek, EmissionType
+from hermes.extensions import db, engine_options, sqlite_pragmas, tune_sqlite
+from hermes.filter import EventIndex, events_query, stations_query
+from hermes.models import DataVersion, Frequency, MapArea, Schedule, Station, Transmission
+from hermes.routes import SCHEDULE_LOADS, STATION_LOADS, compiled_schedule
+from hermes.schemas import (
+    frequencies_serializer,
+    frequency_serializer,
+    map_area_serializer,
+    map_areas_serializer,
+    schedule_serializer,
+    schedules_serializer,
+    station_serializer,
+    stations_serializer,
+    transmission_serializer,
+    transmissions_serializer,
+)
+from hermes.timeline import WeeklyTimeline, cached_timeline, current_minute, store_timeline
+
+# nothing can be lazy loaded outside the session's greenlet, so serializers get everything they touch up front
+FREQUENCY_LOADS = (selectinload(Frequency.times),)
+TRANSMISSION_LOADS = (selectinload(Transmission.times),)
+
+View = Callable[[Request, AsyncSession], Awaitable[Response]]
+
+
+def endpoint(view: View) -> Callable[[Request], Awaitable[Response]]:
+    """Run the view with a session of its own."""
+
+    @wraps(view)
+    async def wrapper(request: Request) -> Response:
+        async with request.app.state.sessions() as session:
+            return await view(request, session)
+
+    return wrapper
+
+
+async def http_error(request: Request, exc: HTTPException) -> Response:
+    """Render werkzeug's HTTP errors just as Flask does."""
+    return Response(exc.get_body(), exc.code or 500, headers=dict(exc.get_headers()))
+
+
+def json_response(request: Request, data) -> Response:
+    return Response(request.app.state.flask.json.dumps(data) + "\n", media_type="application/json")
+
+
+def query_args(request: Request) -> MultiDict:
+    return MultiDict(request.query_params.multi_items())
+
+
+def accepts_ndjson(request: Request) -> bool:
+    return wants_ndjson(parse_accept_header(request.headers.get("Accept"), MIMEAccept))
+
+
+async def get_data_version(session: AsyncSession) -> int:
+    return (await session.execute(select(DataVersion.version))).scalar() or 0
+
+
+async def get_one(session: AsyncSession, query: Select, description: str):
+    try:
+        return (await session.scalars(query)).one()
+    except NoResultFound:
+        raise NotFound(description) from None
+
+
+def versioned(view: View) -> View:
+    """Tag responses with the data version, answering a matching If-None-Match with 304 before running the view."""
+
+    @wraps(view)
+    async def wrapper(request: Request, session: AsyncSession) -> Response:
+        etag = data_etag(await get_data_version(session), accepts_ndjson(request))
+        if parse_etags(request.headers.get("If-None-Match")).contains(etag):
+            response = Response(status_code=304)
+        else:
+            response = await view(request, session)
+        response.headers["ETag"] = quote_etag(etag)
+        response.headers["Vary"] = "Accept"
+        return response
+
+    return wrapper
+
+
+def streamed(request: Request, query: Select, model, serializer, after: int, ndjson: bool) -> StreamingResponse:
+    """Stream every row after the cursor, fetching and serializing one keyset batch at a time as the client reads."""
+    batch_size = request.app.state.flask.config["API_STREAM_BATCH_SIZE"]
+    encoder = StreamEncoder(request.app.state.flask.json.dumps, ndjson)
+
+    async def generate():
+        cursor = after
+        # the view's session is gone by the time the body is sent
+        async with request.app.state.sessions() as session:
+            while batch := (await session.scalars(keyset(query, model, cursor, batch_size))).all():
+                cursor = batch[-1].id
+                yield encoder.batch(serializer.dump(batch))
+                session.expunge_all()
+        if end := encoder.end():
+            yield end
+
+    return StreamingResponse(generate(), media_type=encoder.mimetype)
+
+
+async def paginated(request: Request, session: AsyncSession, query: Select, model, serializer) -> Response:
+    """Dump one keyset page of the query, ordered by id, linking to the next page when there is one.
+
+    With ``?stream=1`` or ``Accept: application/x-ndjson`` every row after the cursor is streamed instead.
+    """
+    args = query_args(request)
+    ndjson = accepts_ndjson(request)
+    after, limit = page_bounds(args, request.app.state.flask.config, ndjson)
+    if limit is None:
+        return streamed(request, query, model, serializer, after, ndjson)
+    rows = (await session.scalars(keyset(query, model, after, limit + 1))).all()
+    response = json_response(request, serializer.dump(rows[:limit]))
+    response.headers.update(next_page_headers(request.url.path, args, rows, limit))
+    return response
+
+
+async def get_timeline(request: Request, session: AsyncSession) -> WeeklyTimeline:
+    """Return the Flask app's timeline, rebuilding it first if schedule data has changed since it was built."""
+    extensions = request.app.state.flask.extensions
+    version = await get_data_version(session)
+    timeline = cached_timeline(extensions, version)
+    if timeline is None:
+        timeline = store_timeline(extensions, version, (await session.scalars(stations_query())).all())
+    return timeline
+
+
+@endpoint
+async def filter_schedule(request: Request, session: AsyncSession) -> Response:
+    flask_app = request.app.state.flask
+    dtr, station_ids = filter_args(flask_app.json.loads(await request.body()))
+    cache = flask_app.extensions["hermes.filter_cache"]
+    key = filter_key(dtr, station_ids)
+    with flask_app.app_context():
+        compiled = compiled_schedule()
+    version = await get_data_version(session) if compiled is None else compiled.data_version
+    events = cache.get(key, version)
+    if events is None:
+        if compiled is None:
+            timelists = (await session.scalars(events_query(dtr, station_ids))).all()
+            found = EventIndex.from_timelists(timelists).query(dtr)
+        else:
+            found = compiled.query(dtr, station_ids)
+        events = cache_events(cache, key, version, found)
+    return json_response(request, events)
+
+
+@endpoint
+async def get_stations_by_schedule(request: Request, session: AsyncSession) -> Response:
+    stations = await session.scalars(select(Station).filter_by(schedule_id=request.path_params["schedule_id"]))
+    return json_response(
+        request,
+        [{"id": station.id, "callsign": station.callsign, "location": station.location} for station in stations],
+    )
+
+
+@endpoint
+async def get_now(request: Request, session: AsyncSession) -> Response:
+    args = query_args(request)
+    lookahead = args.get("lookahead", 0, type=int)
+    if lookahead < 0:
+        raise BadRequest("Lookahead must not be negative")
+    station_ids = set(args.getlist("station_ids", type=int)) or None
+    timeline = await get_timeline(request, session)
+    return json_response(request, timeline.at(current_minute(), lookahead, station_ids))
+
+
+async def get_cache_stats(request: Request) -> Response:
+    return json_response(request, {"filter": request.app.state.flask.extensions["hermes.filter_cache"].stats()})
+
+
+@endpoint
+@versioned
+async def get_schedules(request: Request, session: AsyncSession) -> Response:
+    subquery = select(Schedule.name, func.max(Schedule.date).label("max_date")).group_by(Schedule.name).subquery()
+    latest_schedules = await session.scalars(
+        select(Schedule)
+        .join(subquery, (Schedule.name == subquery.c.name) & (Schedule.date == subquery.c.max_date))
+        .order_by(Schedule.name)
+        .options(*SCHEDULE_LOADS)
+    )
+    return json_response(request, schedules_serializer.dump(latest_schedules))
+
+
+@endpoint
+async def get_schedule(request: Request, session: AsyncSession) -> Response:
+    query = select(Schedule).where(Schedule.id == request.path_params["pk"]).options(*SCHEDULE_LOADS)
+    schedule = await get_one(session, query, "Schedule could not be found")
+    return json_response(request, schedule_serializer.dump(schedule))
+
+
+@endpoint
+@versioned
+async def get_stations(request: Request, session: AsyncSession) -> Response:
+    query = select(Station).options(*STATION_LOADS)
+    if emissions := enum_args(query_args(request), "emission", EmissionType):
+        query = query.where(Station.emissions.intersects(emissions))
+    return await paginated(request, session, query, Station, stations_serializer)
+
+
+@endpoint
+async def get_station(request: Request, session: AsyncSession) -> Response:
+    query = select(Station).where(Station.id == request.path_params["pk"]).options(*STATION_LOADS)
+    station = await get_one(session, query, "Station could not be found")
+    return json_response(request, station_serializer.dump(station))
+
+
+@endpoint
+@versioned
+async def get_frequencies(request: Request, session: AsyncSession) -> Response:
+    query = select(Frequency).options(*FREQUENCY_LOADS)
+    if emissions := enum_args(query_args(request), "emission", EmissionType):
+        query = query.where(Frequency.emissions.intersects(emissions))
+    return await paginated(request, session, query, Frequency, frequencies_serializer)
+
+
+@endpoint
+async def get_frequency(request: Request, session: AsyncSession) -> Response:
+    query = select(Frequency).where(Frequency.id == request.path_params["pk"]).options(*FREQUENCY_LOADS)
+    frequency = await get_one(session, query, "Frequency could not be found")
+    return json_response(request, frequency_serializer.dump(frequency))
+
+
+@endpoint
+@versioned
+async def get_transmissions(request: Request, session: AsyncSession) -> Response:
+    query = select(Transmission).options(*TRANSMISSION_LOADS)
+    if emissions := enum_args(query_args(request), "emission", EmissionType):
+        query = query.where(Transmission.emissions.intersects(emissions))
+    if days := enum_args(query_args(request), "day", DayOfWeek):
+        query = query.where(Transmission.days.intersects(days))
+    return await paginated(request, session, query, Transmission, transmissions_serializer)
+
+
+@endpoint
+async def get_transmission(request: Request, session: AsyncSession) -> Response:
+    query = select(Transmission).where(Transmission.id == request.path_params["pk"]).options(*TRANSMISSION_LOADS)
+    transmission = await get_one(session, query, "Transmission could not be found")
+    return json_response(request, transmission_serializer.dump(transmission))
+
+
+@endpoint
+@versioned
+async def get_map_areas(request: Request, session: AsyncSession) -> Response:
+    return await paginated(request, session, select(MapArea), MapArea, map_areas_serializer)
+
+
+@endpoint
+async def get_map_area(request: Request, session: AsyncSession) -> Response:
+    query = select(MapArea).where(MapArea.id == request.path_params["pk"])
+    map_area = await get_one(session, query, "Map area could not be found")
+    return json_response(request, map_area_serializer.dump(map_area))
+
+
+def async_database_uri(flask_app: Flask) -> str | URL:
+    """ASYNC_DATABASE_URI, or else the Flask app's own SQLite database opened through aiosqlite."""
+    if uri := flask_app.config["ASYNC_DATABASE_URI"]:
+        return uri
+    with flask_app.app_context():
+        url = db.engine.url
+    if url.get_backend_name() != "sqlite":
+        raise ValueError("Set ASYNC_DATABASE_URI to serve a database other than SQLite asynchronously")
+    return url.set(drivername="sqlite+aiosqlite")
+
+
+def create_asgi_app(flask_app: Flask | None = None) -> Starlette:
+    """Serve /filter, /stations/<id> and the read API from an async engine, and everything else from the Flask app."""
+    flask_app = flask_app or create_app()
+    engine = create_async_engine(async_database_uri(flask_app), **engine_options(flask_app.config))
+    tune_sqlite(engine.sync_engine, sqlite_pragmas(flask_app.config))
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await engine.dispose()
+
+    app = Starlette(
+        routes=[
+            Route("/filter", filter_schedule, methods=["POST"]),
+            Route("/stations/{schedule_id:int}", get_stations_by_schedule),
+            Route("/api/now", get_now),
+            Route("/api/cache", get_cache_stats),
+            Route("/api/schedules", get_schedules),
+            Route("/api/schedules/{pk:int}", get_schedule),
+            Route("/api/stations", get_stations),
+            Route("/api/stations/{pk:int}", get_station),
+            Route("/api/frequencies", get_frequencies),
+            Route("/api/frequencies/{pk:int}", get_frequency),
+            Route("/api/transmissions", get_transmissions),
+            Route("/api/transmissions/{pk:int}", get_transmission),
+            Route("/api/map_areas", get_map_areas),
+            Route("/api/map_areas/{pk:int}", get_map_area),
+            # writes, pages and static files
+            Mount("/", WSGIMiddleware(flask_app)),  # type: ignore[arg-type]
+        ],
+        exception_handlers={HTTPException: http_error},  # type: ignore[dict-item]
+        lifespan=lifespan,
+    )
+    app.state.flask = flask_app
+    app.state.sessions = async_sessionmaker(engine, expire_on_commit=False)
+    return app
@@ -0,0 +1,62 @@
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from threading import Lock
+from time import monotonic
+from typing import Any
+
+
+class ResultCache:
+    """A bounded LRU cache whose entries expire after a TTL or as soon as the data version changes."""
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        clock: Callable[[], float] = monotonic,
+        on_lookup: Callable[[bool], None] | None = None,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.on_lookup = on_lookup
+        self.entries: OrderedDict[Hashable, tuple[int, float, Any]] = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, version: int) -> Any | None:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and (entry[0] != version or self.clock() - entry[1] > self.ttl):
+                del self.entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self.entries.move_to_end(key)
+                self.hits += 1
+        if self.on_lookup is not None:
+            self.on_lookup(entry is not None)
+        return None if entry is None else entry[2]
+
+    def put(self, key: Hashable, version: int, value: Any) -> None:
+        with self.lock:
+            self.entries[key] = (version, self.clock(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self.entries),
+                "max_size": self.max_size,
+            }
@@ -1,17 +1,27 @@
 import json
 import os
+import random
 import re
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from contextlib import suppress
 from datetime import date, datetime, time
+from functools import cache
+from itertools import islice
+from time import perf_counter
 
 import click
-from flask import Flask
+import ijson
+from flask import Flask, current_app
 from flask.cli import with_appcontext
+from flask_migrate import stamp
+from sqlalchemy import insert
 from sqlalchemy.exc import IntegrityError
 
-from hermes.extensions import date_format, db
-from hermes.models import Frequency, MapArea, Schedule, Station, TimeList, TimeRange, Transmission
+from hermes.enum import DayOfWeek, EmissionType
+from hermes.extensions import date_format, db, time_format
+from hermes.filter import CompiledSchedule, load_stations
+from hermes.models import Frequency, MapArea, Schedule, Station, TimeList, TimeRange, Transmission, get_data_version
 from hermes.schemas import frequency as frequency_schema
 from hermes.schemas import map_area as map_area_schema
 from hermes.schemas import schedule as schedule_schema
@@ -26,14 +36,228 @@ def init_db(drop):
         db.drop_all()
         click.echo("Dropped all tables.")
     db.create_all()
+    # the tables now match the newest migration
+    stamp()
     click.echo("Database initialized successfully!")
 
 
-@click.command("load-schedule")
-@click.argument("json_file", type=click.Path(exists=True))
+@click.command("compile-schedules")
+@click.option("--output", type=click.Path(dir_okay=False), help="File to write.  [default: COMPILED_SCHEDULE]")
 @with_appcontext
-def load_schedule(json_file):
+def compile_schedules(output):
+    """Precompute every event of every schedule into a file /filter can memory-map."""
+    output = output or current_app.config["COMPILED_SCHEDULE"]
+    if not output:
+        raise click.UsageError("Pass --output or set COMPILED_SCHEDULE.")
+    started = perf_counter()
+    count = CompiledSchedule.write(output, load_stations(), get_data_version())
+    click.echo(f"Compiled {count} events into {output} in {perf_counter() - started:.2f}s.")
+
+
+@cache
+def parse_time(value: str | None) -> time | None:
+    return None if value is None else datetime.strptime(value, time_format).time()
+
+
+def prepare_schedule(schedule_data: dict) -> dict:
+    return {
+        "name": schedule_data["name"],
+        "date": datetime.strptime(schedule_data["date"], date_format).date(),
+        "source_url": schedule_data.get("source_url"),
+    }
+
+
+def prepare_station(station_data: dict) -> dict:
+    """Convert a station from a schedule file into table rows, parsing every time up front."""
+    return {
+        "station": {
+            "callsign": station_data["callsign"],
+            "location": station_data["location"],
+            "region": station_data.get("region"),
+            "emissions": station_data.get("emissions") or [],
+        },
+        "map_areas": [
+            {"ident": map_area_data["ident"], "description": map_area_data["description"]}
+            for map_area_data in station_data.get("map_areas", [])
+        ],
+        "frequencies": [
+            (
+                {
+                    "value": frequency_data["value"],
+                    "callsign": frequency_data.get("callsign"),
+                    "emissions": frequency_data.get("emissions") or [],
+                    "power": frequency_data.get("power"),
+                },
+                [
+                    {"start": parse_time(timerange_data["start"]), "end": parse_time(timerange_data["end"])}
+                    for timerange_data in frequency_data.get("times", [])
+                ],
+            )
+            for frequency_data in station_data.get("frequencies", [])
+        ],
+        "transmissions": [
+            (
+                {
+                    "title": transmission_data["title"],
+                    "emissions": transmission_data.get("emissions") or [],
+                    "days": transmission_data.get("days") or list(DayOfWeek),
+                    "map_area_id": None,
+                },
+                [
+                    {
+                        "initial": parse_time(timelist_data["initial"]),
+                        "rebroadcast": parse_time(timelist_data.get("rebroadcast")),
+                        "valid": parse_time(timelist_data.get("valid")),
+                    }
+                    for timelist_data in transmission_data.get("times", [])
+                ],
+            )
+            for transmission_data in station_data.get("transmissions", [])
+        ],
+    }
+
+
+def parse_schedule_file(json_file: str) -> tuple[dict, list[dict], float]:
+    """Read and prepare a whole schedule file, returning its rows and the time taken."""
+    started = perf_counter()
+    with open(json_file) as file:
+        schedule_data = json.load(file)
+    schedule = prepare_schedule(schedule_data)
+    stations = [prepare_station(station_data) for station_data in schedule_data.get("stations", [])]
+    return schedule, stations, perf_counter() - started
+
+
+def insert_rows(model, rows: list[dict], stats: dict[str, tuple[int, float]]) -> list[int]:
+    """Insert rows into the model's table in a single batch and return their new ids in order."""
+    started = perf_counter()
+    ids = []
+    if rows:
+        statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+        ids = list(db.session.execute(statement, rows).scalars())
+    count, elapsed = stats.get(model.__tablename__, (0, 0.0))
+    stats[model.__tablename__] = (count + len(rows), elapsed + perf_counter() - started)
+    return ids
+
+
+def insert_schedule(schedule: dict, stats: dict[str, tuple[int, float]]) -> int:
+    (schedule_id,) = insert_rows(Schedule, [schedule], stats)
+    return schedule_id
+
+
+def insert_stations(schedule_id: int, stations: list[dict], stats: dict[str, tuple[int, float]]) -> None:
+    station_rows = [{"schedule_id": schedule_id, **station["station"]} for station in stations]
+    station_ids = insert_rows(Station, station_rows, stats)
+    stations_by_id = list(zip(station_ids, stations, strict=True))
+
+    map_area_rows = [
+        {"station_id": station_id, **row} for station_id, station in stations_by_id for row in station["map_areas"]
+    ]
+    insert_rows(MapArea, map_area_rows, stats)
+
+    frequencies = [
+        (station_id, *frequency) for station_id, station in stations_by_id for frequency in station["frequencies"]
+    ]
+    frequency_ids = insert_rows(
+        Frequency, [{"station_id": station_id, **row} for station_id, row, _ in frequencies], stats
+    )
+    time_range_rows = [
+        {"frequency_id": frequency_id, **row}
+        for frequency_id, (_, _, times) in zip(frequency_ids, frequencies, strict=True)
+        for row in times
+    ]
+    insert_rows(TimeRange, time_range_rows, stats)
+
+    transmissions = [
+        (station_id, *transmission)
+        for station_id, station in stations_by_id
+        for transmission in station["transmissions"]
+    ]
+    transmission_ids = insert_rows(
+        Transmission, [{"station_id": station_id, **row} for station_id, row, _ in transmissions], stats
+    )
+    timelist_rows = [
+        {"transmission_id": transmission_id, **row}
+        for transmission_id, (_, _, times) in zip(transmission_ids, transmissions, strict=True)
+        for row in times
+    ]
+    insert_rows(TimeList, timelist_rows, stats)
+
+
+HEADER_FIELDS = ("name", "date", "source_url")
+
+
+def read_schedule_header(file) -> dict:
+    """Collect the top-level fields of a schedule file without building its stations.
+
+    Fields after the stations are found too; ijson steps over the array without keeping it.
+    """
+    header = {}
+    for prefix, event, value in ijson.parse(file):
+        if prefix in HEADER_FIELDS and event in ("string", "null"):
+            header[prefix] = value
+            if len(header) == len(HEADER_FIELDS):
+                break
+    return header
+
+
+def stream_insert_schedule(file, batch_size: int, stats: dict[str, tuple[int, float]]) -> dict:
+    """Insert a schedule file one batch of stations at a time, never holding more than a batch in memory."""
+    schedule = prepare_schedule(read_schedule_header(file))
+    schedule_id = insert_schedule(schedule, stats)
+    file.seek(0)
+    stations = (prepare_station(station_data) for station_data in ijson.items(file, "stations.item", use_float=True))
+    while batch := list(islice(stations, batch_size)):
+        insert_stations(schedule_id, batch, stats)
+    return schedule
+
+
+def load_schedule_files(json_files: tuple[str, ...], batch_size: int, jobs: int | None) -> None:
+    """Parse several schedule files in a process pool and write each one from this process as it arrives."""
+    summary = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(parse_schedule_file, json_file): json_file for json_file in json_files}
+        for future in as_completed(futures):
+            json_file = futures[future]
+            started = perf_counter()
+            try:
+                schedule, stations, parsed = future.result()
+                stats: dict[str, tuple[int, float]] = {}
+                schedule_id = insert_schedule(schedule, stats)
+                for start in range(0, len(stations), batch_size):
+                    insert_stations(schedule_id, stations[start : start + batch_size], stats)
+                db.session.commit()
+                summary[json_file] = (
+                    True,
+                    f"loaded '{schedule['name']}' ({len(stations)} stations), "
+                    f"parsed in {parsed:.3f}s, written in {perf_counter() - started:.3f}s",
+                )
+            except Exception as e:
+                db.session.rollback()
+                summary[json_file] = (False, f"failed: {type(e).__name__}: {e}")
+    for json_file in json_files:
+        loaded, message = summary[json_file]
+        click.echo(f"{json_file}: {message}", err=not loaded)
+    loaded_count = sum(loaded for loaded, _ in summary.values())
+    click.echo(f"Loaded {loaded_count} of {len(json_files)} files.")
+
+
+def load_schedule_file(json_file, bulk, stream, batch_size):
     try:
+        started = perf_counter()
+        if bulk or stream:
+            stats: dict[str, tuple[int, float]] = {}
+            if stream:
+                with open(json_file, "rb") as file:
+                    schedule = stream_insert_schedule(file, batch_size, stats)
+            else:
+                schedule, stations, _ = parse_schedule_file(json_file)
+                insert_stations(insert_schedule(schedule, stats), stations, stats)
+            db.session.commit()
+            click.echo(f"Schedule '{schedule['name']}' loaded successfully.")
+            for table, (count, elapsed) in stats.items():
+                click.echo(f"  {table}: {count} rows in {elapsed:.3f}s")
+            click.echo(f"Total: {perf_counter() - started:.3f}s")
+            return
         with open(json_file) as file:
             schedule_data = json.load(file)
         stations_data = schedule_data.pop("stations", [])
@@ -120,6 +344,24 @@ def load_schedule(json_file):
         click.echo(f"Failed to load schedule: {e}", err=True)
 
 
+@click.command("load-schedule")
+@click.argument("json_files", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option("--bulk", is_flag=True, help="Insert rows in one batch per table instead of one object at a time.")
+@click.option("--stream", is_flag=True, help="Parse and insert stations incrementally, in batches of --batch-size.")
+@click.option(
+    "--batch-size", default=100, show_default=True, help="Stations per batch when streaming or loading many files."
+)
+@click.option("--jobs", type=int, default=None, help="Processes parsing files when loading many.  [default: CPU count]")
+@with_appcontext
+def load_schedule(json_files, bulk, stream, batch_size, jobs):
+    if len(json_files) > 1:
+        if stream:
+            raise click.UsageError("--stream loads a single file.")
+        load_schedule_files(json_files, batch_size, jobs)
+    else:
+        load_schedule_file(json_files[0], bulk, stream, batch_size)
+
+
 def number_from_string(string: str):
     return int(string) if string.isdigit() else float(string)
 
@@ -395,3 +637,103 @@ def make_wefax_schedule(sources):
 
     schedule_dict["date"] = latest_date.strftime(date_format)
     print(json.dumps(schedule_dict))
+
+
+SYNTHETIC_LOCATIONS = ["Newington, CT", "Kodiak, AK", "Honolulu, HI", "Boston, MA", "Pt. Reyes, CA", "Halifax, NS"]
+SYNTHETIC_REGIONS = [None, "North Atlantic", "North Pacific", "Gulf of Mexico", "Arctic"]
+SYNTHETIC_TITLES = [
+    "Surface Analysis",
+    "Sea State Forecast",
+    "Ice Chart",
+    "Code Practice",
+    "Bulletin",
+    "Tropical Update",
+]
+SYNTHETIC_DAYS = [[day.value for day in DayOfWeek], ["Mon", "Tue", "Wed", "Thu", "Fri"], ["Sat", "Sun"]]
+
+
+def synthetic_time(minute: int) -> str:
+    return f"{minute // 60 % 24:02}{minute % 60:02}"
+
+
+def synthetic_schedule(
+    name: str, schedule_date: date, stations: int, frequencies: int, transmissions: int, seed: int
+) -> dict:
+    """A schedule in the load-schedule format with up to the given frequencies and transmissions per station.
+
+    The same arguments always give the same schedule.
+    """
+    rng = random.Random(seed)
+    emissions = [emission.value for emission in EmissionType]
+
+    def some_emissions() -> list[str]:
+        return sorted(rng.sample(emissions, rng.randint(1, 2)))
+
+    stations_list = []
+    for number in range(stations):
+        map_areas = [
+            {"ident": str(ident), "description": f"{rng.choice(SYNTHETIC_REGIONS) or 'Coastal Waters'} {ident}"}
+            for ident in range(1, rng.randint(0, 5) + 1)
+        ]
+        frequencies_list = []
+        for value in sorted(rng.sample(range(2000, 30000), rng.randint(1, frequencies))):
+            times = []
+            for _ in range(rng.choice([0, 1, 1, 2])):
+                # about a third of these run past midnight
+                start = rng.randrange(0, 24 * 60, 15)
+                times.append(
+                    {"start": synthetic_time(start), "end": synthetic_time(start + rng.randrange(60, 16 * 60, 15))}
+                )
+            frequencies_list.append(
+                {
+                    "value": value + rng.choice([0, 0.5, 0.9]),
+                    "emissions": some_emissions(),
+                    "power": rng.choice([1, 4, 10, None]),
+                    "times": times,
+                }
+            )
+        transmissions_list = []
+        for index in range(rng.randint(1, transmissions)):
+            times = []
+            for initial in sorted(rng.sample(range(0, 24 * 60, 5), rng.randint(1, 4))):
+                timelist = {"initial": synthetic_time(initial)}
+                if rng.random() < 0.5:
+                    timelist["valid"] = synthetic_time(initial // 360 * 360)
+                if rng.random() < 0.25:
+                    timelist["rebroadcast"] = synthetic_time(initial + 12 * 60)
+                times.append(timelist)
+            transmission = {
+                "title": f"{rng.choice(SYNTHETIC_TITLES)} {index + 1}",
+                "emissions": some_emissions(),
+                "days": rng.choice(SYNTHETIC_DAYS),
+                "times": times,
+            }
+            if map_areas and rng.random() < 0.5:
+                transmission["map_area"] = rng.choice(map_areas)["ident"]
+            transmissions_list.append(transmission)
+        stations_list.append(
+            {
+                "callsign": f"SYN{number:05}",
+                "location": rng.choice(SYNTHETIC_LOCATIONS),
+                "region": rng.choice(SYNTHETIC_REGIONS),
+                "emissions": some_emissions(),
+                "map_areas": map_areas,
+                "frequencies": frequencies_list,
+                "transmissions": transmissions_list,
+            }
+        )
+    return {"name": name, "date": schedule_date.strftime(date_format), "source_url": None, "stations": stations_list}
+
+
+@click.command("generate-schedule")
+@click.option("--stations", type=click.IntRange(min=0), default=100, show_default=True, help="Stations to generate.")
+@click.option("--frequencies", type=click.IntRange(min=1), default=8, show_default=True, help="Most per station.")
+@click.option("--transmissions", type=click.IntRange(min=1), default=30, show_default=True, help="Most per station.")
+@click.option("--seed", default=0, show_default=True, help="Random seed; the same seed gives the same schedule.")
+@click.option("--name", default="synthetic", show_default=True, help="Schedule name.")
+@click.option("--date", "schedule_date", type=click.DateTime([date_format]), default="2024-11-20", show_default=True)
+@click.option("--output", type=click.File("w"), default="-", help="File to write.  [default: stdout]")
+def generate_schedule(stations, frequencies, transmissions, seed, name, schedule_date, output):
+    """Write a synthetic schedule of any size for load-schedule, for benchmarks and load tests."""
+    schedule_dict = synthetic_schedule(name, schedule_date.date(), stations, frequencies, transmissions, seed)
+    json.dump(schedule_dict, output)
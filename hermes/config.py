@@ -19,6 +19,58 @@ class Config:
     SQLALCHEMY_DATABASE_URI = environ.get("SQLALCHEMY_DATABASE_URI", "sqlite:///hermes.sqlite")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Serve reads from an in-memory copy of the SQLite database, refusing writes
+    READ_ONLY_SNAPSHOT = environ.get("READ_ONLY_SNAPSHOT", "").lower() in ("1", "true", "yes")
+    SNAPSHOT_CHECK_INTERVAL = float(environ.get("SNAPSHOT_CHECK_INTERVAL", 5))
+    SNAPSHOT_RELOAD_SIGNAL = environ.get("SNAPSHOT_RELOAD_SIGNAL", "SIGUSR2")
+
+    # Database for the async read endpoints in hermes.asgi; defaults to SQLALCHEMY_DATABASE_URI through aiosqlite
+    ASYNC_DATABASE_URI = environ.get("ASYNC_DATABASE_URI")
+
+    # Connection pool, left to SQLAlchemy's defaults when unset
+    DATABASE_POOL_SIZE = environ.get("DATABASE_POOL_SIZE")
+    DATABASE_MAX_OVERFLOW = environ.get("DATABASE_MAX_OVERFLOW")
+    DATABASE_POOL_TIMEOUT = environ.get("DATABASE_POOL_TIMEOUT")
+    DATABASE_POOL_RECYCLE = environ.get("DATABASE_POOL_RECYCLE")
+    DATABASE_POOL_PRE_PING = environ.get("DATABASE_POOL_PRE_PING", "").lower() in ("1", "true", "yes")
+
+    # SQLite PRAGMAs run on every new connection; set one to an empty string to keep SQLite's default
+    SQLITE_JOURNAL_MODE = environ.get("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_CACHE_SIZE = environ.get("SQLITE_CACHE_SIZE", "-65536")  # negative means KiB, so 64 MiB
+    SQLITE_MMAP_SIZE = environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))
+    SQLITE_BUSY_TIMEOUT = environ.get("SQLITE_BUSY_TIMEOUT", "5000")  # milliseconds
+    SQLITE_TEMP_STORE = environ.get("SQLITE_TEMP_STORE", "MEMORY")
+
+    # API
+    API_PAGE_SIZE = int(environ.get("API_PAGE_SIZE", 100))
+    API_MAX_PAGE_SIZE = int(environ.get("API_MAX_PAGE_SIZE", 1000))
+    API_STREAM_BATCH_SIZE = int(environ.get("API_STREAM_BATCH_SIZE", 500))
+
+    # Answer /filter from a file written by `flask compile-schedules` instead of the database
+    COMPILED_SCHEDULE = environ.get("COMPILED_SCHEDULE")
+
+    # `flask serve`; workers default to two per CPU plus one
+    SERVE_BIND = environ.get("SERVE_BIND", f"0.0.0.0:{environ.get('PORT', 8888)}")
+    SERVE_WORKERS = environ.get("SERVE_WORKERS")
+    SERVE_THREADS = int(environ.get("SERVE_THREADS", 2))
+    SERVE_TIMEOUT = int(environ.get("SERVE_TIMEOUT", 60))  # seconds before a stuck worker is killed
+    SERVE_GRACEFUL_TIMEOUT = int(environ.get("SERVE_GRACEFUL_TIMEOUT", 30))
+    SERVE_MAX_REQUESTS = int(environ.get("SERVE_MAX_REQUESTS", 10000))  # recycle workers after this many requests
+    SERVE_MAX_REQUESTS_JITTER = int(environ.get("SERVE_MAX_REQUESTS_JITTER", 1000))
+    SERVE_ACCESS_LOG = environ.get("SERVE_ACCESS_LOG")  # "-" for stdout
+
+    # Prometheus metrics at /metrics, unauthenticated; set PROMETHEUS_MULTIPROC_DIR as well with several workers
+    METRICS_ENABLED = environ.get("METRICS_ENABLED", "").lower() in ("1", "true", "yes")
+
+    # Report requests that run one statement QUERY_DETECTOR_THRESHOLD or more times: "log" or "raise", off when empty
+    QUERY_DETECTOR = environ.get("QUERY_DETECTOR", "")
+    QUERY_DETECTOR_THRESHOLD = int(environ.get("QUERY_DETECTOR_THRESHOLD", 3))
+
+    # Caching
+    FILTER_CACHE_SIZE = int(environ.get("FILTER_CACHE_SIZE", 256))
+    FILTER_CACHE_TTL = float(environ.get("FILTER_CACHE_TTL", 300))
+
     # AWS Secrets
     AWS_SECRET_KEY = environ.get("AWS_SECRET_KEY", "")
     AWS_KEY_ID = environ.get("AWS_KEY_ID", "")
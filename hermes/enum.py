@@ -2,7 +2,8 @@ import enum
 import json
 from typing import Generic, TypeVar
 
-from sqlalchemy.types import TEXT, TypeDecorator
+from sqlalchemy import literal
+from sqlalchemy.types import TEXT, Integer, TypeDecorator
 
 # Type variable for enum.Enums
 T = TypeVar("T", bound=enum.Enum)
@@ -26,6 +27,50 @@ class Enums(TypeDecorator, Generic[T]):
         return [self.enum_type(v) for v in json.loads(value)]
 
 
+class EnumSet(TypeDecorator, Generic[T]):
+    """Stores a list of enum members as an integer bitmask, one bit per member in definition order.
+
+    New members must be appended to the enum, never inserted, or existing masks change meaning.
+    """
+
+    impl = Integer
+    cache_ok = True
+
+    class Comparator(TypeDecorator.Comparator):
+        def intersects(self, values):
+            """True where at least one of the given members is set."""
+            return self.expr.op("&", return_type=Integer())(literal(self.type.mask(values), Integer())) != 0
+
+    comparator_factory = Comparator
+
+    def __init__(self, enum_type: type[T], **kwargs):
+        super().__init__(**kwargs)
+        self.enum_type = enum_type
+        self.bits = {member: 1 << index for index, member in enumerate(enum_type)}
+        self.decoded: dict[int, tuple[T, ...]] = {}
+
+    def mask(self, values) -> int:
+        mask = 0
+        for value in values:
+            mask |= self.bits[self.enum_type(value)]
+        return mask
+
+    def members(self, mask: int) -> tuple[T, ...]:
+        if mask not in self.decoded:
+            self.decoded[mask] = tuple(member for member, bit in self.bits.items() if mask & bit)
+        return self.decoded[mask]
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return self.mask(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return list(self.members(value))
+
+
 class DayOfWeek(enum.Enum):
     Sun = "Sun"
     Mon = "Mon"
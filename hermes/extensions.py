@@ -1,7 +1,15 @@
+import logging
+from pathlib import Path
+
+import orjson
+from flask.json.provider import DefaultJSONProvider
+from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import MetaData
+from sqlalchemy import MetaData, event
 from sqlalchemy.orm import DeclarativeBase, MappedAsDataclass
 
+logger = logging.getLogger(__name__)
+
 date_format = "%Y-%m-%d"
 time_format = "%H%M"
 
@@ -19,3 +27,86 @@ class Base(DeclarativeBase, MappedAsDataclass):
 
 
 db = SQLAlchemy(model_class=Base)
+migrate = Migrate(directory=str(Path(__file__).parent / "migrations"), render_as_batch=True)
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, falling back to Flask's default hook for unknown types."""
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get("default", self.default), option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+POOL_OPTIONS = {
+    "DATABASE_POOL_SIZE": ("pool_size", int),
+    "DATABASE_MAX_OVERFLOW": ("max_overflow", int),
+    "DATABASE_POOL_TIMEOUT": ("pool_timeout", float),
+    "DATABASE_POOL_RECYCLE": ("pool_recycle", int),
+}
+SQLITE_PRAGMAS = ["journal_mode", "synchronous", "cache_size", "mmap_size", "busy_timeout", "temp_store"]
+
+
+def engine_options(config) -> dict:
+    """SQLAlchemy engine options from the DATABASE_POOL_* settings, skipping unset ones."""
+    options = {
+        option: convert(config[key])
+        for key, (option, convert) in POOL_OPTIONS.items()
+        if config.get(key) not in (None, "")
+    }
+    if config.get("DATABASE_POOL_PRE_PING"):
+        options["pool_pre_ping"] = True
+    return options
+
+
+def sqlite_pragmas(config) -> dict[str, str]:
+    """The SQLITE_* PRAGMA settings that are set, checked to be plain words or numbers as they go into SQL."""
+    pragmas = {}
+    for name in SQLITE_PRAGMAS:
+        value = str(config.get(f"SQLITE_{name.upper()}") or "")
+        if not value:
+            continue
+        if not value.lstrip("-").isalnum():
+            raise ValueError(f"SQLITE_{name.upper()} must be a word or a number, not {value!r}")
+        pragmas[name] = value
+    return pragmas
+
+
+def tune_sqlite(engine, pragmas: dict[str, str]) -> None:
+    """Run the PRAGMAs on every new connection to a SQLite engine, logging the resulting settings once."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    def log_settings(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+
+        def setting(name):
+            cursor.execute(f"PRAGMA {name}")
+            # an in-memory database has no mmap_size, for one
+            return (cursor.fetchone() or [None])[0]
+
+        settings = {name: setting(name) for name in SQLITE_PRAGMAS}
+        cursor.close()
+        pool = f"{type(engine.pool).__name__}(size={getattr(engine.pool, 'size', lambda: 1)()})"
+        logger.info(
+            "SQLite %s: %s, pool %s",
+            engine.url.database,
+            ", ".join(f"{name}={value}" for name, value in settings.items()),
+            pool,
+        )
+
+    event.listen(engine, "connect", set_pragmas)
+    event.listen(engine, "connect", log_settings, once=True)
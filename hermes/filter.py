@@ -1,9 +1,29 @@
-from datetime import datetime, time
+import mmap
+import os
+import struct
+from bisect import bisect_left
+from collections.abc import Iterable, Sequence
+from datetime import time
+from pathlib import Path
 from typing import ClassVar
 
+import numpy as np
+from sqlalchemy import ColumnElement, Select, and_, or_, select
+from sqlalchemy.orm import contains_eager, selectinload
+
 from hermes.enum import DayOfWeek, EmissionType
-from hermes.extensions import time_format
-from hermes.models import Frequency, Station, Transmission
+from hermes.extensions import db, time_format
+from hermes.models import Frequency, Station, TimeList, Transmission
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# a transmission's time list on one of its days
+Occurrence = tuple[Station, Transmission, DayOfWeek, TimeList]
+
+
+def minute_of_week(day: DayOfWeek, check_time: time) -> int:
+    return Event.day_indices[day] * MINUTES_PER_DAY + check_time.hour * 60 + check_time.minute
 
 
 class DateTimeRange:
@@ -23,6 +43,20 @@ class DateTimeRange:
                 return True
         return False
 
+    def windows(self) -> list[tuple[int, int]]:
+        """Return the range as inclusive minute-of-week intervals.
+
+        Ranges spanning midnight continue into the next day, and a range
+        running past the end of Saturday is split in two at the week boundary.
+        """
+        start = minute_of_week(self.day, self.start_time)
+        end = minute_of_week(self.day, self.end_time)
+        if self.start_time >= self.end_time:
+            end += MINUTES_PER_DAY
+        if end < MINUTES_PER_WEEK:
+            return [(start, end)]
+        return [(0, end - MINUTES_PER_WEEK), (start, MINUTES_PER_WEEK - 1)]
+
 
 class Event:
     day_order: ClassVar = list(DayOfWeek)
@@ -35,6 +69,15 @@ class Event:
         self.station = station
         self.frequencies = frequencies
 
+    def to_dict(self) -> dict:
+        return {
+            "day": self.day.value,
+            "time": self.time.strftime(time_format),
+            "name": self.name,
+            "station": self.station,
+            "frequencies": self.frequencies,
+        }
+
     @staticmethod
     def sort_key(event: "Event") -> tuple:
         day_idx = Event.day_indices[event.day]
@@ -42,7 +85,7 @@ class Event:
 
 
 def get_emissions(station: Station, transmission: Transmission, frequencies: list[Frequency]) -> list[EmissionType]:
-    emissions = []
+    emissions: list[EmissionType] = []
 
     if station.emissions:
         emissions = station.emissions
@@ -50,30 +93,332 @@ def get_emissions(station: Station, transmission: Transmission, frequencies: lis
         emissions = transmission.emissions
     frequency_emissions = {emission for frequency in frequencies for emission in frequency.emissions}
     if frequency_emissions:
-        emissions = list(frequency_emissions)
+        # in declaration order, as set order changes from one process to the next
+        emissions = [emission for emission in EmissionType if emission in frequency_emissions]
     return emissions
 
 
+class FrequencyIndex:
+    """Frequencies of a station keyed by the times they are in use.
+
+    Time ranges spanning midnight are split in two up front, and the answer
+    at every range boundary and in every gap between boundaries is computed
+    once, so a lookup is a single bisection.
+    """
+
+    def __init__(self, station: Station):
+        self.frequencies = list(station.frequencies)
+        always: list[int] = []
+        ranges: list[tuple[time, time, int]] = []
+        for position, frequency in enumerate(self.frequencies):
+            if frequency.times == []:
+                always.append(position)
+            for time_range in frequency.times:
+                if time_range.start <= time_range.end:
+                    ranges.append((time_range.start, time_range.end, position))
+                else:
+                    ranges.append((time_range.start, time.max, position))
+                    ranges.append((time.min, time_range.end, position))
+        self.points = sorted({boundary for start, end, _ in ranges for boundary in (start, end)})
+        self.at_points = [self._in_use(always, ranges, point, point) for point in self.points]
+        self.between_points = [
+            self._in_use(always, ranges, low, high) for low, high in zip(self.points, self.points[1:], strict=False)
+        ]
+        self.outside_points = self._in_use(always, [], time.min, time.max)
+
+    def _in_use(self, always, ranges, low, high) -> list[Frequency]:
+        positions = set(always)
+        positions.update(position for start, end, position in ranges if start <= low and high <= end)
+        return [self.frequencies[position] for position in sorted(positions)]
+
+    def at_time(self, reference_time: time) -> list[Frequency]:
+        index = bisect_left(self.points, reference_time)
+        if index < len(self.points) and self.points[index] == reference_time:
+            return self.at_points[index]
+        if 0 < index < len(self.points):
+            return self.between_points[index - 1]
+        return self.outside_points
+
+
+class EventIndex:
+    """Sorted minute-of-week index of every transmission time of a set of stations.
+
+    Entries are ordered the same way `get_events` has always ordered its
+    results, so a window query is two bisections.  Start times are kept in a
+    NumPy array so that many windows can be bisected in one batch.
+    """
+
+    def __init__(self, stations: Sequence[Station]):
+        self.build(
+            (station, transmission, day, timelist)
+            for station in stations
+            for transmission in station.transmissions
+            for day in transmission.days
+            for timelist in transmission.times
+        )
+
+    @classmethod
+    def from_timelists(cls, timelists: Sequence[TimeList]) -> "EventIndex":
+        """Index just the given time lists, each on every day of its transmission."""
+        index = cls.__new__(cls)
+        index.build(
+            (timelist.transmission.station, timelist.transmission, day, timelist)
+            for timelist in timelists
+            for day in timelist.transmission.days
+        )
+        return index
+
+    def build(self, occurrences: Iterable[Occurrence]) -> None:
+        entries = [
+            (minute_of_week(day, timelist.initial), seq, station, transmission, day, timelist)
+            for seq, (station, transmission, day, timelist) in enumerate(occurrences)
+        ]
+        entries.sort(key=lambda entry: entry[:2])
+        self.minutes = np.array([entry[0] for entry in entries], dtype=np.int32)
+        self.entries: list[Occurrence] = [entry[2:] for entry in entries]
+        self.frequency_indices: dict[int, FrequencyIndex] = {}
+        self.frequencies_at: dict[tuple[int, time], list[Frequency]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def positions(self, dtrs: list[DateTimeRange]) -> list[np.ndarray]:
+        """Return the positions of the entries matching each range, bisecting all ranges in one batch."""
+        windows = [dtr.windows() for dtr in dtrs]
+        bounds = np.array([window for dtr_windows in windows for window in dtr_windows], dtype=np.int32)
+        bounds = bounds.reshape(-1, 2)
+        firsts = np.searchsorted(self.minutes, bounds[:, 0], side="left")
+        lasts = np.searchsorted(self.minutes, bounds[:, 1], side="right")
+        positions: list[np.ndarray] = []
+        offset = 0
+        for dtr_windows in windows:
+            spans = range(offset, offset + len(dtr_windows))
+            positions.append(np.concatenate([np.arange(firsts[span], lasts[span]) for span in spans]))
+            offset += len(dtr_windows)
+        return positions
+
+    def query(self, dtr: DateTimeRange) -> list[Event]:
+        return self.query_many([dtr])[0]
+
+    def query_many(self, dtrs: list[DateTimeRange]) -> list[list[Event]]:
+        return [[self.event(position) for position in positions] for positions in self.positions(dtrs)]
+
+    def event(self, position: int) -> Event:
+        station, transmission, day, timelist = self.entries[position]
+        freqs = self.get_frequencies_at_time(station, timelist.initial)
+        return make_event(station, transmission, day, timelist, freqs)
+
+    def get_frequencies_at_time(self, station: Station, reference_time: time) -> list[Frequency]:
+        key = (station.id, reference_time)
+        if key not in self.frequencies_at:
+            if station.id not in self.frequency_indices:
+                self.frequency_indices[station.id] = FrequencyIndex(station)
+            self.frequencies_at[key] = self.frequency_indices[station.id].at_time(reference_time)
+        return self.frequencies_at[key]
+
+
+def make_event(
+    station: Station, transmission: Transmission, day: DayOfWeek, timelist: TimeList, freqs: list[Frequency]
+) -> Event:
+    emissions = get_emissions(station, transmission, freqs)
+    name = f"{transmission.title} ({', '.join([e.value for e in emissions])})" if emissions else transmission.title
+    tag = f"{station.callsign} ({station.location})"
+    frequencies = [freq.value for freq in freqs]
+    return Event(day, timelist.initial, name, tag, frequencies)
+
+
+def stations_query(station_ids: list[int] | None = None) -> Select:
+    """Select stations (all of them by default) with everything `get_events` touches in a fixed number of queries."""
+    query = select(Station).options(
+        selectinload(Station.frequencies).selectinload(Frequency.times),
+        selectinload(Station.transmissions).selectinload(Transmission.times),
+    )
+    if station_ids is not None:
+        query = query.where(Station.id.in_(station_ids))
+    return query
+
+
+def load_stations(station_ids: list[int] | None = None) -> list[Station]:
+    return list(db.session.scalars(stations_query(station_ids)))
+
+
+def window_clause(dtr: DateTimeRange) -> ColumnElement[bool]:
+    """SQL form of `DateTimeRange.in_range` over a time list's initial time and its transmission's days."""
+    if dtr.start_time < dtr.end_time:
+        return and_(Transmission.days.intersects([dtr.day]), TimeList.initial.between(dtr.start_time, dtr.end_time))
+    return or_(
+        and_(Transmission.days.intersects([dtr.day]), TimeList.initial >= dtr.start_time),
+        and_(Transmission.days.intersects([dtr.day.next()]), TimeList.initial <= dtr.end_time),
+    )
+
+
+def events_query(dtr: DateTimeRange, station_ids: list[int] | None = None) -> Select:
+    """Select the time lists falling in the range, with what `EventIndex.from_timelists` needs loaded alongside."""
+    query = (
+        select(TimeList)
+        .join(TimeList.transmission)
+        .join(Transmission.station)
+        .where(window_clause(dtr))
+        .order_by(Station.id, Transmission.id, TimeList.id)
+        .options(
+            contains_eager(TimeList.transmission)
+            .contains_eager(Transmission.station)
+            .selectinload(Station.frequencies)
+            .selectinload(Frequency.times)
+        )
+    )
+    if station_ids is not None:
+        query = query.where(Station.id.in_(station_ids))
+    return query
+
+
+def query_events(dtr: DateTimeRange, station_ids: list[int] | None = None) -> list[Event]:
+    """Like `get_events`, but only the time lists falling in the range are fetched from the database."""
+    return EventIndex.from_timelists(db.session.scalars(events_query(dtr, station_ids)).all()).query(dtr)
+
+
 def get_events(dtr: DateTimeRange, stations: list[Station]) -> list[Event]:
-    events: list[Event] = []
-
-    for station in stations:
-        transmissions = Transmission.query.filter(Transmission.station_id == station.id).all()
-        for transmission in transmissions:
-            for day in transmission.days:
-                for timelist in transmission.times:
-                    if dtr.in_range(day, timelist.initial):
-                        freqs = station.get_frequencies_at_time(timelist.initial)
-                        emissions = get_emissions(station, transmission, freqs)
-                        name = (
-                            f"{transmission.title} ({', '.join([e.value for e in emissions])})"
-                            if emissions
-                            else transmission.title
-                        )
-                        tag = f"{station.callsign} ({station.location})"
-                        frequencies = [freq.value for freq in freqs]
-                        new_event = Event(day, timelist.initial, name, tag, frequencies)
-                        events.append(new_event)
-
-    events.sort(key=Event.sort_key)
-    return events
+    return EventIndex(stations).query(dtr)
+
+
+def get_events_many(dtrs: list[DateTimeRange], stations: list[Station]) -> list[list[Event]]:
+    return EventIndex(stations).query_many(dtrs)
+
+
+class CompiledSchedule:
+    """Every event of every schedule, precomputed and read from a memory-mapped file.
+
+    The file starts with a header, then holds one fixed-width array after
+    another, each 8-byte aligned: the events' minutes of the week (sorted),
+    station indices, name string ids and offsets into the frequency values;
+    the frequency values; the stations' database ids, callsign string ids
+    and location string ids; and the string table's offsets and UTF-8
+    bytes.  Arrays are NumPy views onto the mapping, so processes opening
+    the same file share one copy in the page cache.
+    """
+
+    magic = b"HRMS"
+    format_version = 1
+    header = struct.Struct("<4sIQIIII")
+    arrays: ClassVar = [
+        ("minutes", "<i4", "events"),
+        ("event_stations", "<i4", "events"),
+        ("event_names", "<i4", "events"),
+        ("frequency_offsets", "<i4", "events + 1"),
+        ("frequency_values", "<f8", "frequencies"),
+        ("station_ids", "<i4", "stations"),
+        ("station_callsigns", "<i4", "stations"),
+        ("station_locations", "<i4", "stations"),
+        ("string_offsets", "<i4", "strings + 1"),
+    ]
+    minutes: np.ndarray
+    event_stations: np.ndarray
+    event_names: np.ndarray
+    frequency_offsets: np.ndarray
+    frequency_values: np.ndarray
+    station_ids: np.ndarray
+    station_callsigns: np.ndarray
+    station_locations: np.ndarray
+    string_offsets: np.ndarray
+
+    def __init__(self, path: str | os.PathLike):
+        with open(path, "rb") as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.mmap) < self.header.size:
+            raise ValueError(f"{path} is not a version {self.format_version} compiled schedule")
+        magic, version, self.data_version, events, frequencies, stations, strings = self.header.unpack_from(self.mmap)
+        if magic != self.magic or version != self.format_version:
+            raise ValueError(f"{path} is not a version {self.format_version} compiled schedule")
+        counts = {"events": events, "events + 1": events + 1, "frequencies": frequencies}
+        counts |= {"stations": stations, "strings": strings, "strings + 1": strings + 1}
+        offset = self.header.size
+        for name, dtype, count in self.arrays:
+            offset = -(-offset // 8) * 8
+            array = np.frombuffer(self.mmap, dtype=dtype, count=counts[count], offset=offset)
+            setattr(self, name, array)
+            offset += array.nbytes
+        self.string_bytes = offset
+        self.strings: dict[int, str] = {}
+        self.station_indices = {station_id: index for index, station_id in enumerate(self.station_ids.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.minutes)
+
+    def string(self, string_id: int) -> str:
+        if string_id not in self.strings:
+            start, end = self.string_offsets[string_id : string_id + 2].tolist()
+            self.strings[string_id] = self.mmap[self.string_bytes + start : self.string_bytes + end].decode()
+        return self.strings[string_id]
+
+    def query(self, dtr: DateTimeRange, station_ids: list[int] | None = None) -> list[Event]:
+        """Events in the range, in the order `get_events` gives them, from the given stations or all of them."""
+        windows = np.array(dtr.windows(), dtype=np.int32)
+        firsts = np.searchsorted(self.minutes, windows[:, 0], side="left")
+        lasts = np.searchsorted(self.minutes, windows[:, 1], side="right")
+        positions = np.concatenate([np.arange(first, last) for first, last in zip(firsts, lasts, strict=True)])
+        if station_ids is not None:
+            wanted = [
+                self.station_indices[station_id] for station_id in station_ids if station_id in self.station_indices
+            ]
+            positions = positions[np.isin(self.event_stations[positions], wanted)]
+        return [self.event(position) for position in positions.tolist()]
+
+    def event(self, position: int) -> Event:
+        minute = int(self.minutes[position])
+        station = int(self.event_stations[position])
+        start, end = self.frequency_offsets[position : position + 2].tolist()
+        callsign = self.string(int(self.station_callsigns[station]))
+        location = self.string(int(self.station_locations[station]))
+        return Event(
+            Event.day_order[minute // MINUTES_PER_DAY],
+            time(minute % MINUTES_PER_DAY // 60, minute % 60),
+            self.string(int(self.event_names[position])),
+            f"{callsign} ({location})",
+            self.frequency_values[start:end].tolist(),
+        )
+
+    @classmethod
+    def write(cls, path: str | os.PathLike, stations: list[Station], data_version: int) -> int:
+        """Compile the stations' events into a file at path, replacing it atomically, and return the event count."""
+        index = EventIndex(stations)
+        strings: dict[str, int] = {}
+
+        def intern(value: str) -> int:
+            return strings.setdefault(value, len(strings))
+
+        station_positions = {station.id: position for position, station in enumerate(stations)}
+        events = [index.event(position) for position in range(len(index))]
+        frequency_values = [value for event in events for value in event.frequencies]
+        columns = {
+            "minutes": index.minutes,
+            "event_stations": [station_positions[entry[0].id] for entry in index.entries],
+            "event_names": [intern(event.name) for event in events],
+            "frequency_offsets": np.cumsum([0] + [len(event.frequencies) for event in events]),
+            "frequency_values": frequency_values,
+            "station_ids": [station.id for station in stations],
+            "station_callsigns": [intern(station.callsign) for station in stations],
+            "station_locations": [intern(station.location) for station in stations],
+        }
+        encoded = [value.encode() for value in strings]
+        columns["string_offsets"] = np.cumsum([0] + [len(value) for value in encoded])
+
+        path = Path(path)
+        partial = path.with_name(path.name + ".partial")
+        with open(partial, "wb") as file:
+            file.write(
+                cls.header.pack(
+                    cls.magic,
+                    cls.format_version,
+                    data_version,
+                    len(events),
+                    len(frequency_values),
+                    len(stations),
+                    len(strings),
+                )
+            )
+            for name, dtype, _ in cls.arrays:
+                file.write(b"\0" * (-file.tell() % 8))
+                file.write(np.asarray(columns[name], dtype=dtype).tobytes())
+            file.write(b"".join(encoded))
+        os.replace(partial, path)
+        return len(events)
@@ -0,0 +1,128 @@
+import os
+from pathlib import Path
+from time import perf_counter
+
+from flask import Flask, Response, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import Engine, event
+
+from hermes.extensions import db
+
+# prometheus_client reads this when it is imported, so it has to be in the environment from the start
+MULTIPROCESS_DIR = "PROMETHEUS_MULTIPROC_DIR"
+SIZE_BUCKETS = [2**power for power in range(6, 25, 2)]  # 64 B to 16 MiB
+SQL_BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
+
+REQUEST_DURATION = Histogram(
+    "hermes_request_duration_seconds", "Time spent answering requests.", ["method", "endpoint", "status"]
+)
+RESPONSE_SIZE = Histogram(
+    "hermes_response_size_bytes", "Size of response bodies with a known length.", ["endpoint"], buckets=SIZE_BUCKETS
+)
+REQUEST_STATEMENTS = Histogram(
+    "hermes_request_sql_statements",
+    "SQL statements executed per request.",
+    ["endpoint"],
+    buckets=[0, 1, 2, 3, 5, 10, 25, 50, 100, 250],
+)
+SQL_DURATION = Histogram(
+    "hermes_sql_duration_seconds", "Time spent executing SQL statements.", ["endpoint"], buckets=SQL_BUCKETS
+)
+CACHE_LOOKUPS = Counter("hermes_cache_lookups_total", "Cache lookups by cache and result.", ["cache", "result"])
+
+
+def endpoint_label() -> str:
+    """The matched endpoint, which unlike the path has a bounded number of values."""
+    return request.endpoint or "unmatched"
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement a request runs, and count it against the request.
+
+    Statements run outside a request, by CLI commands for instance, are left out of the totals `/metrics` reports.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("hermes.started", []).append(perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - conn.info["hermes.started"].pop()
+        if not has_request_context():
+            return
+        SQL_DURATION.labels(endpoint_label()).observe(elapsed)
+        if "request_metrics" in g:
+            g.request_metrics["statements"] += 1
+
+
+def before_request() -> None:
+    g.request_metrics = {"started": perf_counter(), "statements": 0}
+
+
+def after_request(response: Response) -> Response:
+    measured = g.get("request_metrics")
+    if measured is None or request.endpoint == "metrics":
+        return response
+    method, endpoint, status = request.method, endpoint_label(), str(response.status_code)
+    size = response.content_length
+
+    def record():
+        # on close, so streamed responses are timed and counted to the end
+        REQUEST_DURATION.labels(method, endpoint, status).observe(perf_counter() - measured["started"])
+        REQUEST_STATEMENTS.labels(endpoint).observe(measured["statements"])
+        if size is not None:
+            RESPONSE_SIZE.labels(endpoint).observe(size)
+
+    response.call_on_close(record)
+    return response
+
+
+def metrics() -> Response:
+    """Every metric in Prometheus text format, summed over all worker processes in multiprocess mode."""
+    registry = REGISTRY
+    if os.environ.get(MULTIPROCESS_DIR):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def make_multiprocess_dir() -> None:
+    """Create the directory metrics are written to, which any process touching a metric needs, not only workers."""
+    directory = os.environ.get(MULTIPROCESS_DIR)
+    if directory:
+        Path(directory).mkdir(parents=True, exist_ok=True)
+
+
+def reset_multiprocess_dir() -> None:
+    """Clear the values left behind by the workers of an earlier run."""
+    directory = os.environ.get(MULTIPROCESS_DIR)
+    if directory:
+        make_multiprocess_dir()
+        for path in Path(directory).glob("*.db"):
+            path.unlink()
+
+
+def mark_process_dead(pid: int) -> None:
+    if os.environ.get(MULTIPROCESS_DIR):
+        multiprocess.mark_process_dead(pid)
+
+
+def init_metrics(app: Flask) -> None:
+    app.before_request(before_request)
+    app.after_request(after_request)
+    app.add_url_rule("/metrics", "metrics", metrics)
+    with app.app_context():
+        instrument_engine(db.engine)
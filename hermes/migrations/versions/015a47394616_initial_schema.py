@@ -0,0 +1,113 @@
+"""initial schema
+
+The tables as `flask init-db` created them before migrations, with days and
+emissions still stored as JSON text.
+
+Revision ID: 015a47394616
+Revises:
+Create Date: 2026-10-18 03:36:27.755265
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "015a47394616"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "schedule",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("source_url", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_schedule")),
+        sa.UniqueConstraint("name", "date", name="unique_name_date"),
+    )
+    op.create_table(
+        "station",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("schedule_id", sa.Integer(), nullable=False),
+        sa.Column("callsign", sa.String(), nullable=False),
+        sa.Column("location", sa.String(), nullable=False),
+        sa.Column("region", sa.String(), nullable=True),
+        sa.Column("emissions", sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(["schedule_id"], ["schedule.id"], name=op.f("fk_station_schedule_id_schedule")),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_station")),
+        sa.UniqueConstraint("schedule_id", "callsign", name="unique_schedule_id_callsign"),
+    )
+    op.create_table(
+        "frequency",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("station_id", sa.Integer(), nullable=False),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.Column("callsign", sa.String(), nullable=True),
+        sa.Column("emissions", sa.Text(), nullable=False),
+        sa.Column("power", sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(["station_id"], ["station.id"], name=op.f("fk_frequency_station_id_station")),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_frequency")),
+        sa.UniqueConstraint("station_id", "value", name="unique_station_id_value"),
+    )
+    op.create_table(
+        "map_area",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("station_id", sa.Integer(), nullable=False),
+        sa.Column("ident", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(["station_id"], ["station.id"], name=op.f("fk_map_area_station_id_station")),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_map_area")),
+        sa.UniqueConstraint("station_id", "ident", name="unique_station_id_ident"),
+    )
+    op.create_table(
+        "time_range",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("frequency_id", sa.Integer(), nullable=False),
+        sa.Column("start", sa.Time(), nullable=False),
+        sa.Column("end", sa.Time(), nullable=False),
+        sa.ForeignKeyConstraint(["frequency_id"], ["frequency.id"], name=op.f("fk_time_range_frequency_id_frequency")),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_time_range")),
+    )
+    op.create_table(
+        "transmission",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("station_id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("emissions", sa.Text(), nullable=False),
+        sa.Column("days", sa.Text(), nullable=False),
+        sa.Column("map_area_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["map_area_id", "station_id"],
+            ["map_area.id", "map_area.station_id"],
+            name="fk_transmission_map_area_id_station_id_map_area",
+        ),
+        sa.ForeignKeyConstraint(["map_area_id"], ["map_area.id"], name=op.f("fk_transmission_map_area_id_map_area")),
+        sa.ForeignKeyConstraint(["station_id"], ["station.id"], name=op.f("fk_transmission_station_id_station")),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_transmission")),
+    )
+    op.create_table(
+        "times",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("transmission_id", sa.Integer(), nullable=False),
+        sa.Column("initial", sa.Time(), nullable=False),
+        sa.Column("rebroadcast", sa.Time(), nullable=True),
+        sa.Column("valid", sa.Time(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["transmission_id"], ["transmission.id"], name=op.f("fk_times_transmission_id_transmission")
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_times")),
+    )
+
+
+def downgrade():
+    op.drop_table("times")
+    op.drop_table("transmission")
+    op.drop_table("time_range")
+    op.drop_table("map_area")
+    op.drop_table("frequency")
+    op.drop_table("station")
+    op.drop_table("schedule")
@@ -0,0 +1,38 @@
+"""index foreign keys and initial times
+
+Indexes the foreign keys followed by the nested API dumps and /filter's
+eager loads, plus times (initial, transmission_id) for its time window.
+station.schedule_id and frequency.station_id lead unique constraints, whose
+indexes already serve them.
+
+Revision ID: 2750fba4e07c
+Revises: 49395f2cb366
+Create Date: 2026-10-18 03:55:42.907315
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "2750fba4e07c"
+down_revision = "49395f2cb366"
+branch_labels = None
+depends_on = None
+
+indexes = [
+    ("ix_time_range_frequency_id", "time_range", ["frequency_id"]),
+    ("ix_transmission_station_id", "transmission", ["station_id"]),
+    ("ix_times_transmission_id", "times", ["transmission_id"]),
+    ("ix_times_initial_transmission_id", "times", ["initial", "transmission_id"]),
+]
+
+
+def upgrade():
+    for name, table, columns in indexes:
+        # init-db already created ix_times_initial_transmission_id before there were migrations
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(indexes):
+        op.drop_index(name, table_name=table)
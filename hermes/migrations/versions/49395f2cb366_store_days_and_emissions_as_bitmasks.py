@@ -0,0 +1,64 @@
+"""store days and emissions as bitmasks
+
+Revision ID: 49395f2cb366
+Revises: 015a47394616
+Create Date: 2026-10-18 03:52:10.418220
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from hermes.enum import DayOfWeek, EmissionType, Enums, EnumSet
+
+# revision identifiers, used by Alembic.
+revision = "49395f2cb366"
+down_revision = "015a47394616"
+branch_labels = None
+depends_on = None
+
+columns = [
+    ("station", "emissions", EmissionType),
+    ("frequency", "emissions", EmissionType),
+    ("transmission", "emissions", EmissionType),
+    ("transmission", "days", DayOfWeek),
+]
+
+
+def convert(table, name, new_type, convert_value):
+    """Swap a column for one of new_type, carrying every value across through convert_value."""
+    connection = op.get_bind()
+    rows = [
+        {"id": row_id, "value": convert_value(value)}
+        for row_id, value in connection.execute(sa.text(f"SELECT id, {name} FROM {table}"))
+    ]
+    op.add_column(table, sa.Column(f"{name}_new", new_type, nullable=True))
+    if rows:
+        connection.execute(sa.text(f"UPDATE {table} SET {name}_new = :value WHERE id = :id"), rows)
+    with op.batch_alter_table(table) as batch_op:
+        batch_op.drop_column(name)
+        batch_op.alter_column(f"{name}_new", new_column_name=name, existing_type=new_type, nullable=False)
+
+
+def upgrade():
+    for table, name, enum_type in columns:
+        legacy, enum_set = Enums(enum_type), EnumSet(enum_type)
+        convert(
+            table,
+            name,
+            sa.Integer(),
+            lambda value, legacy=legacy, enum_set=enum_set: enum_set.mask(legacy.process_result_value(value, None)),
+        )
+
+
+def downgrade():
+    for table, name, enum_type in columns:
+        legacy, enum_set = Enums(enum_type), EnumSet(enum_type)
+        convert(
+            table,
+            name,
+            sa.Text(),
+            lambda value, legacy=legacy, enum_set=enum_set: legacy.process_bind_param(
+                enum_set.process_result_value(value, None), None
+            ),
+        )
@@ -0,0 +1,33 @@
+"""add data version
+
+The counter /filter, /api/now and the ETags key their caches on.  Databases
+that init-db created after it was added already have the table.
+
+Revision ID: 8c1f3a9d5b27
+Revises: 2750fba4e07c
+Create Date: 2026-10-18 09:12:04.518342
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8c1f3a9d5b27"
+down_revision = "2750fba4e07c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "data_version",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_data_version")),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table("data_version")
@@ -1,11 +1,13 @@
 from datetime import date as dtdate
 from datetime import datetime, time
+from itertools import chain
+from time import time_ns
 
-from sqlalchemy import ForeignKey, UniqueConstraint
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import BigInteger, ForeignKey, Index, UniqueConstraint, event, insert, select, update
+from sqlalchemy.orm import Mapped, Session, mapped_column, relationship
 from sqlalchemy.schema import ForeignKeyConstraint
 
-from hermes.enum import DayOfWeek, EmissionType, Enums
+from hermes.enum import DayOfWeek, EmissionType, EnumSet
 from hermes.extensions import date_format, db, time_format
 
 
@@ -38,7 +40,7 @@ class Station(db.Model):  # type: ignore[name-defined]
     callsign: Mapped[str]
     location: Mapped[str]
     region: Mapped[str | None]
-    emissions: Mapped[list[EmissionType]] = mapped_column(Enums(EmissionType))
+    emissions: Mapped[list[EmissionType]] = mapped_column(EnumSet(EmissionType))
 
     frequencies: Mapped[list["Frequency"]] = relationship(back_populates="station")
     transmissions: Mapped[list["Transmission"]] = relationship(back_populates="station")
@@ -82,7 +84,7 @@ class Frequency(db.Model):  # type: ignore[name-defined]
 
     value: Mapped[float]
     callsign: Mapped[str | None]
-    emissions: Mapped[list[EmissionType]] = mapped_column(Enums(EmissionType))
+    emissions: Mapped[list[EmissionType]] = mapped_column(EnumSet(EmissionType))
     times: Mapped[list["TimeRange"]] = relationship(back_populates="frequency")
     power: Mapped[float | None]
 
@@ -101,20 +103,22 @@ class Transmission(db.Model):  # type: ignore[name-defined]
     __tablename__ = "transmission"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    station_id: Mapped[int] = mapped_column(ForeignKey("station.id"))
+    station_id: Mapped[int] = mapped_column(ForeignKey("station.id"), index=True)
     station: Mapped["Station"] = relationship(back_populates="transmissions")
 
     title: Mapped[str]
     times: Mapped[list["TimeList"]] = relationship(back_populates="transmission")
-    emissions: Mapped[list[EmissionType]] = mapped_column(Enums(EmissionType))
-    days: Mapped[list[DayOfWeek]] = mapped_column(Enums(DayOfWeek))
+    emissions: Mapped[list[EmissionType]] = mapped_column(EnumSet(EmissionType))
+    days: Mapped[list[DayOfWeek]] = mapped_column(EnumSet(DayOfWeek))
 
     map_area_id: Mapped[int | None] = mapped_column(ForeignKey("map_area.id"))
 
     __table_args__ = (
+        # named explicitly, as the naming convention would give it the same name as map_area_id's own key
         ForeignKeyConstraint(
             ["map_area_id", "station_id"],
             ["map_area.id", "map_area.station_id"],
+            name="fk_transmission_map_area_id_station_id_map_area",
         ),
     )
 
@@ -149,7 +153,7 @@ class TimeRange(db.Model):  # type: ignore[name-defined]
     __tablename__ = "time_range"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    frequency_id: Mapped[int] = mapped_column(ForeignKey("frequency.id"))
+    frequency_id: Mapped[int] = mapped_column(ForeignKey("frequency.id"), index=True)
     frequency: Mapped["Frequency"] = relationship(back_populates="times")
 
     start: Mapped[time]
@@ -165,13 +169,16 @@ class TimeList(db.Model):  # type: ignore[name-defined]
     __tablename__ = "times"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    transmission_id: Mapped[int] = mapped_column(ForeignKey("transmission.id"))
+    transmission_id: Mapped[int] = mapped_column(ForeignKey("transmission.id"), index=True)
     transmission: Mapped["Transmission"] = relationship(back_populates="times")
 
     initial: Mapped[time]
     rebroadcast: Mapped[time | None]
     valid: Mapped[time | None]
 
+    # serves the time window predicate of hermes.filter.query_events
+    __table_args__ = (Index("ix_times_initial_transmission_id", "initial", "transmission_id"),)
+
     def __init__(self, transmission, initial, rebroadcast=None, valid=None):
         self.transmission_id = transmission.id
         self.initial = datetime.strptime(initial, time_format).time() if type(initial) == str else initial
@@ -179,3 +186,54 @@ class TimeList(db.Model):  # type: ignore[name-defined]
             datetime.strptime(rebroadcast, time_format).time() if type(rebroadcast) == str else rebroadcast
         )
         self.valid = datetime.strptime(valid, time_format).time() if type(valid) == str else valid
+
+
+class DataVersion(db.Model):  # type: ignore[name-defined]
+    __tablename__ = "data_version"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # microseconds since the epoch to start with, which overflows a 32-bit INTEGER
+    version: Mapped[int] = mapped_column(BigInteger)
+
+
+def get_data_version() -> int:
+    return db.session.execute(select(DataVersion.version)).scalar() or 0
+
+
+def bump_data_version(session: Session) -> None:
+    if session.execute(update(DataVersion).values(version=DataVersion.version + 1)).rowcount == 0:
+        # seeded from the clock so a recreated database never repeats a version a running server has seen
+        session.execute(insert(DataVersion).values(id=1, version=time_ns() // 1000))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def track_statement_writes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["data_changed"] = True
+
+
+def changes_schedule_data(session: Session) -> bool:
+    modified = (obj for obj in session.dirty if session.is_modified(obj))
+    return any(not isinstance(obj, DataVersion) for obj in chain(session.new, session.deleted, modified))
+
+
+@event.listens_for(Session, "after_flush")
+def track_flushed_writes(session, flush_context):
+    # the flushed objects leave new, dirty and deleted afterwards, whether the flush was explicit or an autoflush
+    if changes_schedule_data(session):
+        session.info["data_changed"] = True
+
+
+@event.listens_for(Session, "before_commit")
+def bump_data_version_on_commit(session):
+    """Every commit that writes schedule data, through the ORM or bulk statements, bumps the data version."""
+    # objects still pending here are flushed by the commit itself, after this runs
+    pending = session.new or session.dirty or session.deleted
+    if pending or session.info.get("data_changed"):
+        bump_data_version(session)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def forget_data_changes(session):
+    session.info["data_changed"] = False
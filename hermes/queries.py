@@ -0,0 +1,93 @@
+import logging
+import sysconfig
+import traceback
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from flask import Flask, Response, current_app, g, has_request_context, request
+from sqlalchemy import Engine, event
+
+from hermes.extensions import db
+
+logger = logging.getLogger(__name__)
+
+PACKAGE = Path(__file__).parent
+LIBRARIES = {Path(sysconfig.get_path(name)) for name in ("stdlib", "platstdlib", "purelib", "platlib")}
+MODES = {"log", "raise"}
+
+
+class NPlusOneError(Exception):
+    """A request ran the same statement, with different parameters, too many times."""
+
+
+@dataclass
+class Repeat:
+    count: int = 0
+    parameters: set[str] = field(default_factory=set)
+    call_sites: dict[str, int] = field(default_factory=dict)
+
+
+def call_site() -> str:
+    """The innermost frame of app or test code, rather than of SQLAlchemy, Flask or this module."""
+    for frame in reversed(traceback.extract_stack()):
+        path = Path(frame.filename)
+        if path == Path(__file__) or frame.filename.startswith("<"):
+            continue
+        if path.is_relative_to(PACKAGE) or not any(path.is_relative_to(library) for library in LIBRARIES):
+            return f"{frame.filename}:{frame.lineno} in {frame.name}"
+    return "unknown"  # pragma: no cover
+
+
+def watch_engine(engine: Engine) -> None:
+    """Note every statement run during a request with its parameters and where it came from, keyed by its SQL."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not has_request_context() or "queries" not in g:
+            return
+        repeat = g.queries.setdefault(statement, Repeat())
+        repeat.count += 1
+        repeat.parameters.add(repr(parameters))
+        site = call_site()
+        repeat.call_sites[site] = repeat.call_sites.get(site, 0) + 1
+
+
+def before_request() -> None:
+    g.queries = {}
+
+
+def after_request(response: Response) -> Response:
+    """Report statements the request ran with at least QUERY_DETECTOR_THRESHOLD different sets of parameters.
+
+    Running a statement again with the same parameters is wasteful too, but not the per-row pattern this looks for.
+
+    Streamed bodies are fetched after this runs, one batch per statement on purpose, so they are not checked.
+    """
+    queries = g.pop("queries", None)
+    if not queries:
+        return response
+    threshold = current_app.config["QUERY_DETECTOR_THRESHOLD"]
+    repeats = {statement: repeat for statement, repeat in queries.items() if len(repeat.parameters) >= threshold}
+    total = sum(repeat.count for repeat in queries.values())
+    logger.debug("%s %s ran %d statements", request.method, request.path, total)
+    if not repeats:
+        return response
+    lines = [f"{request.method} {request.path} ran {total} statements, repeating {len(repeats)}:"]
+    for statement, repeat in repeats.items():
+        lines.append(f"  {repeat.count} x {' '.join(statement.split())}")
+        lines.extend(f"    {count} from {site}" for site, count in repeat.call_sites.items())
+    message = "\n".join(lines)
+    if current_app.config["QUERY_DETECTOR"] == "raise":
+        raise NPlusOneError(message)
+    logger.warning(message)
+    return response
+
+
+def init_query_detector(app: Flask) -> None:
+    mode = app.config["QUERY_DETECTOR"]
+    if mode not in MODES:
+        raise ValueError(f"QUERY_DETECTOR must be one of {', '.join(sorted(MODES))}, not {mode!r}")
+    app.before_request(before_request)
+    app.after_request(after_request)
+    with app.app_context():
+        watch_engine(db.engine)
@@ -1,28 +1,61 @@
-from datetime import datetime, time
+import logging
+import os
+from datetime import time
+from functools import wraps
 
-from flask import Blueprint, abort, jsonify, render_template, request
+from flask import Blueprint, abort, current_app, jsonify, render_template, request, stream_with_context
 from marshmallow import ValidationError
 from sqlalchemy import func
 from sqlalchemy.exc import NoResultFound
-from sqlalchemy.orm import aliased
-
-from hermes.enum import DayOfWeek
-from hermes.extensions import db, time_format
-from hermes.filter import DateTimeRange, Event, get_events
-from hermes.models import Frequency, MapArea, Schedule, Station, Transmission
-from hermes.schemas import frequencies as frequencies_schema
+from sqlalchemy.orm import aliased, selectinload
+
+from hermes.api import (
+    StreamEncoder,
+    cache_events,
+    data_etag,
+    enum_args,
+    filter_args,
+    filter_key,
+    keyset,
+    next_page_headers,
+    page_bounds,
+    wants_ndjson,
+)
+from hermes.enum import DayOfWeek, EmissionType
+from hermes.extensions import db
+from hermes.filter import CompiledSchedule, Event, query_events
+from hermes.models import Frequency, MapArea, Schedule, Station, Transmission, get_data_version
+from hermes.schemas import (
+    frequencies_serializer,
+    frequency_serializer,
+    map_area_serializer,
+    map_areas_serializer,
+    schedule_serializer,
+    schedules_serializer,
+    station_serializer,
+    stations_serializer,
+    transmission_serializer,
+    transmissions_serializer,
+)
 from hermes.schemas import frequency as frequency_schema
 from hermes.schemas import map_area as map_area_schema
-from hermes.schemas import map_areas as map_areas_schema
 from hermes.schemas import schedule as schedule_schema
-from hermes.schemas import schedules as schedules_schema
 from hermes.schemas import station as station_schema
-from hermes.schemas import stations as stations_schema
 from hermes.schemas import transmission as transmission_schema
-from hermes.schemas import transmissions as transmissions_schema
+from hermes.timeline import current_minute, get_timeline
+
+logger = logging.getLogger(__name__)
 
 main_bp = Blueprint("main", __name__)
 
+# eager loads for everything the serializers walk, so a dump never goes back for one row at a time
+STATION_LOADS = (
+    selectinload(Station.frequencies).selectinload(Frequency.times),
+    selectinload(Station.transmissions).selectinload(Transmission.times),
+    selectinload(Station.map_areas),
+)
+SCHEDULE_LOADS = (selectinload(Schedule.stations).options(*STATION_LOADS),)
+
 
 @main_bp.route("/")
 def home():
@@ -40,35 +73,110 @@ def get_stations_by_schedule(schedule_id):
 
 @main_bp.route("/filter", methods=["POST"])
 def filter_schedule():
-    json_data = request.get_json()
-    required_keys = ["start_day", "start_time", "end_time", "station_ids"]
-    missing_keys = [key for key in required_keys if key not in json_data]
-    start_day = DayOfWeek[json_data["start_day"]]
-    start_time = datetime.strptime(json_data["start_time"], time_format).time()
-    end_time = datetime.strptime(json_data["end_time"], time_format).time()
+    dtr, station_ids = filter_args(request.get_json())
+    cache = current_app.extensions["hermes.filter_cache"]
+    key = filter_key(dtr, station_ids)
+    compiled = compiled_schedule()
+    version = get_data_version() if compiled is None else compiled.data_version
+    events = cache.get(key, version)
+    if events is None:
+        found = query_events(dtr, station_ids) if compiled is None else compiled.query(dtr, station_ids)
+        events = cache_events(cache, key, version, found)
+    return jsonify(events)
+
+
+def compiled_schedule() -> CompiledSchedule | None:
+    """The file named by COMPILED_SCHEDULE, mapped once and again whenever it is replaced.
+
+    None when the setting is empty, or when the file cannot be read, so /filter falls back to the database.
+    """
+    path = current_app.config["COMPILED_SCHEDULE"]
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        loaded = current_app.extensions.get("hermes.compiled_schedule")
+        if loaded is None or loaded[0] != identity:
+            loaded = (identity, CompiledSchedule(path))
+            current_app.extensions["hermes.compiled_schedule"] = loaded
+    except (OSError, ValueError) as exc:
+        # once per failure rather than on every request
+        if current_app.extensions.get("hermes.compiled_schedule_error") != str(exc):
+            logger.warning("Answering /filter from the database: %s", exc)
+            current_app.extensions["hermes.compiled_schedule_error"] = str(exc)
+        return None
+    current_app.extensions.pop("hermes.compiled_schedule_error", None)
+    return loaded[1]
 
-    dtr = DateTimeRange(day=start_day, start_time=start_time, end_time=end_time)
-    stations = Station.query.filter(Station.id.in_(json_data["station_ids"])).all()
 
-    events = get_events(dtr, stations)
-    return jsonify(
-        [
-            {
-                "day": event.day.value,
-                "time": event.time.strftime(time_format),
-                "name": event.name,
-                "station": event.station,
-                "frequencies": event.frequencies,
-            }
-            for event in events
-        ]
-    )
+api_bp = Blueprint("api", __name__)
 
 
-api_bp = Blueprint("api", __name__)
+def versioned(view):
+    """Tag responses with the data version, answering a matching If-None-Match with 304 before running the view."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        etag = data_etag(get_data_version(), wants_ndjson(request.accept_mimetypes))
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.make_response(view(*args, **kwargs))
+        response.set_etag(etag)
+        response.vary.add("Accept")
+        return response
+
+    return wrapper
+
+
+def streamed(query, model, serializer, after: int, ndjson: bool):
+    """Stream every row after the cursor, fetching and serializing one keyset batch at a time as the client reads."""
+    batch_size = current_app.config["API_STREAM_BATCH_SIZE"]
+    encoder = StreamEncoder(current_app.json.dumps, ndjson)
+
+    def generate():
+        cursor = after
+        while batch := keyset(query, model, cursor, batch_size).all():
+            cursor = batch[-1].id
+            yield encoder.batch(serializer.dump(batch))
+        if end := encoder.end():
+            yield end
+
+    return current_app.response_class(stream_with_context(generate()), mimetype=encoder.mimetype)
+
+
+def paginated(query, model, serializer):
+    """Dump one keyset page of the query, ordered by id, linking to the next page when there is one.
+
+    With ``?stream=1`` or ``Accept: application/x-ndjson`` every row after the cursor is streamed instead.
+    """
+    ndjson = wants_ndjson(request.accept_mimetypes)
+    after, limit = page_bounds(request.args, current_app.config, ndjson)
+    if limit is None:
+        return streamed(query, model, serializer, after, ndjson)
+    rows = keyset(query, model, after, limit + 1).all()
+    response = jsonify(serializer.dump(rows[:limit]))
+    response.headers.update(next_page_headers(request.script_root + request.path, request.args, rows, limit))
+    return response
+
+
+@api_bp.route("/now")
+def get_now():
+    lookahead = request.args.get("lookahead", 0, type=int)
+    if lookahead < 0:
+        abort(400, description="Lookahead must not be negative")
+    station_ids = set(request.args.getlist("station_ids", type=int)) or None
+    return jsonify(get_timeline().at(current_minute(), lookahead, station_ids))
+
+
+@api_bp.route("/cache")
+def get_cache_stats():
+    return jsonify({"filter": current_app.extensions["hermes.filter_cache"].stats()})
 
 
 @api_bp.route("/schedules")
+@versioned
 def get_schedules():
     subquery = (
         db.session.query(Schedule.name, func.max(Schedule.date).label("max_date")).group_by(Schedule.name).subquery()
@@ -78,18 +186,19 @@ def get_schedules():
         db.session.query(Schedule)
         .join(subquery, (Schedule.name == subquery.c.name) & (Schedule.date == subquery.c.max_date))
         .order_by(Schedule.name)
+        .options(*SCHEDULE_LOADS)
         .all()
     )
-    return jsonify(schedules_schema.dump(latest_schedules))
+    return jsonify(schedules_serializer.dump(latest_schedules))
 
 
 @api_bp.route("/schedules/<int:pk>")
 def get_schedule(pk):
     try:
-        schedule = Schedule.query.filter(Schedule.id == pk).one()
+        schedule = Schedule.query.filter(Schedule.id == pk).options(*SCHEDULE_LOADS).one()
     except NoResultFound:
         abort(404, "Schedule could not be found")
-    schedule_result = schedule_schema.dump(schedule)
+    schedule_result = schedule_serializer.dump(schedule)
     return schedule_result
 
 
@@ -113,7 +222,7 @@ def post_schedule():
         db.session.commit()
     except Exception as e:  # pragma: no cover
         abort(400, description=str(e))
-    result = schedule_schema.dump(db.session.get(Schedule, schedule.id))
+    result = schedule_serializer.dump(db.session.get(Schedule, schedule.id))
     return result, 201
 
 
@@ -132,18 +241,21 @@ def delete_schedule(pk):
 
 
 @api_bp.route("/stations")
+@versioned
 def get_stations():
-    all_stations = Station.query.all()
-    return jsonify(stations_schema.dump(all_stations))
+    query = Station.query.options(*STATION_LOADS)
+    if emissions := enum_args(request.args, "emission", EmissionType):
+        query = query.filter(Station.emissions.intersects(emissions))
+    return paginated(query, Station, stations_serializer)
 
 
 @api_bp.route("/stations/<int:pk>")
 def get_station(pk):
     try:
-        station = Station.query.filter(Station.id == pk).one()
+        station = Station.query.filter(Station.id == pk).options(*STATION_LOADS).one()
     except NoResultFound:
         abort(404, "Station could not be found")
-    station_result = station_schema.dump(station)
+    station_result = station_serializer.dump(station)
     return station_result
 
 
@@ -178,7 +290,7 @@ def post_station():
         db.session.commit()
     except Exception as e:  # pragma: no cover
         abort(400, description=str(e))
-    result = station_schema.dump(db.session.get(Station, station.id))
+    result = station_serializer.dump(db.session.get(Station, station.id))
     return result, 201
 
 
@@ -199,9 +311,12 @@ def delete_station(pk):
 
 
 @api_bp.route("/frequencies")
+@versioned
 def get_frequencies():
-    all_frequencies = Frequency.query.all()
-    return jsonify(frequencies_schema.dump(all_frequencies))
+    query = Frequency.query.options(selectinload(Frequency.times))
+    if emissions := enum_args(request.args, "emission", EmissionType):
+        query = query.filter(Frequency.emissions.intersects(emissions))
+    return paginated(query, Frequency, frequencies_serializer)
 
 
 @api_bp.route("/frequencies/<int:pk>")
@@ -210,7 +325,7 @@ def get_frequency(pk):
         frequency = Frequency.query.filter(Frequency.id == pk).one()
     except NoResultFound:
         abort(404, "Frequency could not be found")
-    frequency_result = frequency_schema.dump(frequency)
+    frequency_result = frequency_serializer.dump(frequency)
     return frequency_result
 
 
@@ -244,7 +359,7 @@ def post_frequency():
         db.session.commit()
     except Exception as e:  # pragma: no cover
         abort(400, description=str(e))
-    result = frequency_schema.dump(db.session.get(Frequency, frequency.id))
+    result = frequency_serializer.dump(db.session.get(Frequency, frequency.id))
     return result, 201
 
 
@@ -265,9 +380,14 @@ def delete_frequency(pk):
 
 
 @api_bp.route("/transmissions")
+@versioned
 def get_transmissions():
-    all_transmissions = Transmission.query.all()
-    return jsonify(transmissions_schema.dump(all_transmissions))
+    query = Transmission.query.options(selectinload(Transmission.times))
+    if emissions := enum_args(request.args, "emission", EmissionType):
+        query = query.filter(Transmission.emissions.intersects(emissions))
+    if days := enum_args(request.args, "day", DayOfWeek):
+        query = query.filter(Transmission.days.intersects(days))
+    return paginated(query, Transmission, transmissions_serializer)
 
 
 @api_bp.route("/transmissions/<int:pk>")
@@ -276,7 +396,7 @@ def get_transmission(pk):
         transmission = Transmission.query.filter(Transmission.id == pk).one()
     except NoResultFound:
         abort(404, "Transmission could not be found")
-    transmission_result = transmission_schema.dump(transmission)
+    transmission_result = transmission_serializer.dump(transmission)
     return transmission_result
 
 
@@ -319,7 +439,7 @@ def post_transmission():
         db.session.commit()
     except Exception as e:  # pragma: no cover
         abort(400, description=str(e))
-    result = transmission_schema.dump(db.session.get(Transmission, transmission.id))
+    result = transmission_serializer.dump(db.session.get(Transmission, transmission.id))
     return result, 201
 
 
@@ -340,9 +460,9 @@ def delete_transmission(pk):
 
 
 @api_bp.route("/map_areas")
+@versioned
 def get_map_areas():
-    all_map_areas = MapArea.query.all()
-    return jsonify(map_areas_schema.dump(all_map_areas))
+    return paginated(MapArea.query, MapArea, map_areas_serializer)
 
 
 @api_bp.route("/map_areas/<int:pk>")
@@ -351,7 +471,7 @@ def get_map_area(pk):
         map_area = MapArea.query.filter(MapArea.id == pk).one()
     except NoResultFound:
         abort(404, "Map area could not be found")
-    map_area_result = map_area_schema.dump(map_area)
+    map_area_result = map_area_serializer.dump(map_area)
     return map_area_result
 
 
@@ -382,7 +502,7 @@ def post_map_area():
         db.session.commit()
     except Exception as e:  # pragma: no cover
         abort(400, description=str(e))
-    result = map_area_schema.dump(db.session.get(MapArea, map_area.id))
+    result = map_area_serializer.dump(db.session.get(MapArea, map_area.id))
     return result, 201
 
 
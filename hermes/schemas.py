@@ -1,3 +1,7 @@
+from collections.abc import Callable
+from operator import attrgetter
+from typing import Any
+
 from marshmallow import fields
 from marshmallow_sqlalchemy import SQLAlchemySchema
 
@@ -114,3 +118,62 @@ class Schedule(Schema):
 
 schedule = Schedule()
 schedules = Schedule(many=True)
+
+
+def field_converter(field: fields.Field) -> Callable[[Any], Any] | None:
+    """Work out once how a marshmallow field turns a non-null value into JSON; None means as-is."""
+    if isinstance(field, fields.Nested):
+        return Serializer(field.schema).dump
+    if isinstance(field, fields.List):
+        inner = field_converter(field.inner)
+        return list if inner is None else lambda values: [inner(value) for value in values]
+    if isinstance(field, fields.Enum):
+        return attrgetter("value" if field.by_value else "name")
+    if isinstance(field, fields.DateTime):
+        data_format = field.format or field.DEFAULT_FORMAT
+        return field.SERIALIZATION_FUNCS.get(data_format) or (lambda value: value.strftime(data_format))
+    if isinstance(field, fields.Float):
+        return float
+    if isinstance(field, fields.Integer):
+        return int
+    if isinstance(field, fields.String):
+        return None
+    return lambda value: field._serialize(value, None, None)
+
+
+class Serializer:
+    """Read-only dumper producing the same JSON shape as a schema, with field accessors compiled up front.
+
+    Marshmallow stays in charge of validating input; this only replaces `Schema.dump` on read endpoints.
+    """
+
+    def __init__(self, schema: Schema):
+        self.many = schema.many
+        self.accessors = [
+            (field.data_key or name, attrgetter(field.attribute or name), field_converter(field))
+            for name, field in schema.dump_fields.items()
+        ]
+
+    def dump_one(self, obj) -> dict:
+        result = {}
+        for key, getter, convert in self.accessors:
+            value = getter(obj)
+            result[key] = value if convert is None or value is None else convert(value)
+        return result
+
+    def dump(self, obj):
+        if self.many:
+            return [self.dump_one(item) for item in obj]
+        return self.dump_one(obj)
+
+
+schedule_serializer = Serializer(schedule)
+schedules_serializer = Serializer(schedules)
+station_serializer = Serializer(station)
+stations_serializer = Serializer(stations)
+frequency_serializer = Serializer(frequency)
+frequencies_serializer = Serializer(frequencies)
+transmission_serializer = Serializer(transmission)
+transmissions_serializer = Serializer(transmissions)
+map_area_serializer = Serializer(map_area)
+map_areas_serializer = Serializer(map_areas)
@@ -0,0 +1,100 @@
+import gc
+import logging
+import os
+from contextvars import Context
+
+import click
+from flask import Flask, current_app
+from flask.cli import with_appcontext
+from gunicorn.app.base import BaseApplication
+from sqlalchemy.exc import SQLAlchemyError
+
+from hermes.extensions import db
+from hermes.metrics import mark_process_dead, reset_multiprocess_dir
+from hermes.snapshot import install_reload_signal
+
+logger = logging.getLogger(__name__)
+
+
+class HermesApplication(BaseApplication):
+    """Gunicorn application serving an app that has already been created."""
+
+    def __init__(self, app: Flask, options: dict):
+        self.application = app
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+def worker_count(config) -> int:
+    """SERVE_WORKERS if set, otherwise gunicorn's usual two workers per CPU plus one."""
+    if config["SERVE_WORKERS"]:
+        return int(config["SERVE_WORKERS"])
+    return 2 * (os.cpu_count() or 1) + 1
+
+
+def gunicorn_options(app: Flask, bind: str | None = None, workers: int | None = None, threads: int | None = None):
+    """Gunicorn settings from the app's SERVE_* config, overridden by whatever is passed."""
+    config = app.config
+
+    def post_worker_init(worker):
+        # gunicorn resets signal handlers in each worker after forking
+        install_reload_signal(app)
+
+    def child_exit(server, worker):
+        mark_process_dead(worker.pid)
+
+    return {
+        "bind": bind or config["SERVE_BIND"],
+        "workers": workers or worker_count(config),
+        "threads": threads or config["SERVE_THREADS"],
+        "timeout": config["SERVE_TIMEOUT"],
+        "graceful_timeout": config["SERVE_GRACEFUL_TIMEOUT"],
+        "max_requests": config["SERVE_MAX_REQUESTS"],
+        "max_requests_jitter": config["SERVE_MAX_REQUESTS_JITTER"],
+        "preload_app": True,
+        "accesslog": config["SERVE_ACCESS_LOG"] or None,
+        "post_worker_init": post_worker_init,
+        "child_exit": child_exit,
+    }
+
+
+def warm_caches(app: Flask) -> None:
+    """Build the caches each worker would otherwise build on its first request, so they inherit them instead."""
+    from hermes.routes import compiled_schedule
+    from hermes.timeline import get_timeline
+
+    with app.app_context():
+        try:
+            get_timeline()
+            compiled_schedule()
+        except (OSError, SQLAlchemyError) as exc:
+            logger.warning("Starting with cold caches: %s", exc)
+        # connections must not be shared with the workers
+        db.engine.dispose()
+    # keep the collector from touching, and so copying, everything built so far
+    gc.freeze()
+
+
+@click.command("serve")
+@click.option("--bind", help="Address to listen on.  [default: SERVE_BIND]")
+@click.option(
+    "--workers", type=click.IntRange(min=1), help="Worker processes.  [default: SERVE_WORKERS or 2 x CPUs + 1]"
+)
+@click.option("--threads", type=click.IntRange(min=1), help="Threads per worker.  [default: SERVE_THREADS]")
+@with_appcontext
+def serve(bind, workers, threads):
+    """Serve the app with gunicorn, preloading it so workers share its warm caches."""
+    app = current_app._get_current_object()
+    options = gunicorn_options(app, bind, workers, threads)
+    reset_multiprocess_dir()
+    warm_caches(app)
+    click.echo(f"Serving on {options['bind']} with {options['workers']} workers of {options['threads']} threads.")
+    # outside the command's app context, so each request pushes its own
+    Context().run(HermesApplication(app, options).run)
@@ -0,0 +1,145 @@
+import logging
+import os
+import signal
+import sqlite3
+from contextlib import suppress
+from itertools import count
+from pathlib import Path
+from threading import Lock
+from time import monotonic
+
+from flask import Flask, abort, current_app, request
+from sqlalchemy.engine import make_url
+
+from hermes.extensions import db
+
+logger = logging.getLogger(__name__)
+
+# endpoints that take a POST body but never write
+READ_ENDPOINTS = {"main.filter_schedule"}
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+generations = count(1)
+
+
+class Snapshot:
+    """In-memory copy of an on-disk SQLite database that the app serves reads from.
+
+    Connections open a named shared-cache memory database.  A reload backs the
+    file up into a fresh one and points new connections at it, so a request
+    sees either the old copy or the new one, never a half-loaded mix.
+    """
+
+    def __init__(self, path: Path, check_interval: float):
+        self.path = path
+        self.check_interval = check_interval
+        self.lock = Lock()
+        self.uri: str | None = None
+        self.holder: sqlite3.Connection | None = None
+        self.pid: int | None = None
+        self.source_mtime: float | None = None
+        self.checked = 0.0
+        self.reload_requested = False
+        self.missing = False
+
+    def connect(self) -> sqlite3.Connection:
+        """Connection creator for the engine, always opening the current copy."""
+        if self.pid != os.getpid():
+            self.load(dispose=False)
+        assert self.uri is not None, "load() sets the uri"
+        connection = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+        connection.execute("PRAGMA query_only = ON")
+        return connection
+
+    def mtime(self) -> float | None:
+        """Latest modification time of the database file and its write-ahead log, or None without the file."""
+        try:
+            mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        with suppress(FileNotFoundError):
+            mtime = max(mtime, self.path.with_name(self.path.name + "-wal").stat().st_mtime)
+        return mtime
+
+    def keep_current(self) -> None:
+        """Go on serving the copy already loaded while the file is gone, say while it is being swapped for another."""
+        self.checked, self.reload_requested = monotonic(), False
+        # once rather than on every request until it is back
+        if not self.missing:
+            logger.warning("%s is missing, so the snapshot loaded from it is served until it is back", self.path)
+            self.missing = True
+
+    def load(self, dispose: bool = True) -> None:
+        """Copy the database file into a new memory database and switch connections over to it."""
+        with self.lock:
+            source_mtime = self.mtime()
+            if source_mtime is None and self.uri is not None:
+                self.keep_current()
+                return
+            uri = f"file:hermes-snapshot-{os.getpid()}-{next(generations)}?mode=memory&cache=shared"
+            holder = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            source = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            try:
+                source.backup(holder)
+            finally:
+                source.close()
+            forked = self.pid != os.getpid()
+            previous = self.holder
+            self.uri, self.holder, self.pid = uri, holder, os.getpid()
+            self.source_mtime, self.checked, self.reload_requested = source_mtime, monotonic(), False
+            self.missing = False
+        if not forked and previous is not None:
+            # connections still reading the old copy keep it alive until they are returned
+            db.engine.dispose()
+            previous.close()
+        elif dispose:
+            # pooled connections and the old copy were inherited from the parent, which still owns them
+            db.engine.dispose(close=False)
+        logger.info("Loaded snapshot of %s into %s", self.path, uri)
+
+    def stale(self) -> bool:
+        if self.reload_requested or self.pid != os.getpid():
+            return True
+        if monotonic() - self.checked < self.check_interval:
+            return False
+        self.checked = monotonic()
+        mtime = self.mtime()
+        if mtime is None:
+            self.keep_current()
+            return False
+        return mtime != self.source_mtime
+
+    def request_reload(self, signum=None, frame=None) -> None:
+        self.reload_requested = True
+
+
+def refresh_snapshot():
+    """Turn writes away with 503 and reload the snapshot first if the file changed or a reload was asked for."""
+    if request.method not in SAFE_METHODS and request.endpoint not in READ_ENDPOINTS:
+        abort(503, description="This server is a read-only snapshot")
+    snapshot = current_app.extensions["hermes.snapshot"]
+    if snapshot.stale():
+        snapshot.load()
+
+
+def init_snapshot(app: Flask) -> None:
+    """Serve the app from a snapshot of its SQLite database, to be called before the engine is created."""
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        raise ValueError("READ_ONLY_SNAPSHOT needs an SQLite database file")
+    snapshot = Snapshot(Path(app.instance_path, url.database), app.config["SNAPSHOT_CHECK_INTERVAL"])
+    app.extensions["hermes.snapshot"] = snapshot
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {**app.config["SQLALCHEMY_ENGINE_OPTIONS"], "creator": snapshot.connect}
+    app.before_request(refresh_snapshot)
+    install_reload_signal(app)
+
+
+def install_reload_signal(app: Flask) -> None:
+    """Have SNAPSHOT_RELOAD_SIGNAL reload the app's snapshot, if it serves one."""
+    snapshot = app.extensions.get("hermes.snapshot")
+    if snapshot is None or not (reload_signal := app.config["SNAPSHOT_RELOAD_SIGNAL"]):
+        return
+    try:
+        signal.signal(signal.Signals[reload_signal], snapshot.request_reload)
+    except ValueError:  # pragma: no cover
+        logger.warning("Not in the main thread, so %s will not reload the snapshot", reload_signal)
@@ -0,0 +1,58 @@
+from collections.abc import Sequence
+from datetime import UTC, datetime
+
+from flask import current_app
+
+from hermes.filter import MINUTES_PER_WEEK, Event, EventIndex, load_stations, minute_of_week
+from hermes.metrics import record_cache_lookup
+from hermes.models import Station, get_data_version
+
+
+def current_minute() -> int:
+    now = datetime.now(UTC)
+    return minute_of_week(Event.day_order[(now.weekday() + 1) % 7], now.time())
+
+
+class WeeklyTimeline:
+    """Every event of the week, rendered once and bucketed by the minute of the week it starts in."""
+
+    def __init__(self, stations: Sequence[Station]):
+        self.buckets: list[list[tuple[int, dict]]] = [[] for _ in range(MINUTES_PER_WEEK)]
+        index = EventIndex(stations)
+        for position, minute in enumerate(index.minutes):
+            station = index.entries[position][0]
+            self.buckets[minute].append((station.id, index.event(position).to_dict()))
+
+    def at(self, minute: int, lookahead: int = 0, station_ids: set[int] | None = None) -> list[dict]:
+        """Return the events starting from `minute` through `lookahead` minutes later."""
+        events = []
+        for offset in range(min(lookahead, MINUTES_PER_WEEK - 1) + 1):
+            for station_id, event in self.buckets[(minute + offset) % MINUTES_PER_WEEK]:
+                if station_ids is None or station_id in station_ids:
+                    events.append(event)
+        return events
+
+
+def cached_timeline(extensions: dict, version: int) -> WeeklyTimeline | None:
+    """The timeline kept in the app's extensions, unless schedule data has changed since it was built."""
+    cached = extensions.get("hermes.timeline")
+    if cached is None or cached[0] != version:
+        record_cache_lookup("timeline", False)
+        return None
+    record_cache_lookup("timeline", True)
+    return cached[1]
+
+
+def store_timeline(extensions: dict, version: int, stations: Sequence[Station]) -> WeeklyTimeline:
+    timeline = WeeklyTimeline(stations)
+    extensions["hermes.timeline"] = (version, timeline)
+    return timeline
+
+
+def get_timeline() -> WeeklyTimeline:
+    """Return the app's timeline, rebuilding it first if schedule data has changed since it was built."""
+    version = get_data_version()
+    timeline = cached_timeline(current_app.extensions, version)
+    if timeline is None:
+        timeline = store_timeline(current_app.extensions, version, load_stations())
+    return timeline
@@ -1,6 +1,7 @@
 from datetime import date, time
 
 import pytest
+from sqlalchemy import event
 
 from hermes import create_app
 from hermes.enum import DayOfWeek, EmissionType
@@ -10,7 +11,14 @@ from hermes.models import Frequency, MapArea, Schedule, Station, TimeList, TimeR
 
 @pytest.fixture(scope="function")
 def app():
-    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+            "METRICS_ENABLED": True,
+            "QUERY_DETECTOR": "raise",
+        }
+    )
 
     with app.app_context():
         db.drop_all()
@@ -33,6 +41,42 @@ def session(app):
         db.session.rollback()
 
 
+@pytest.fixture(scope="function")
+def statements(app):
+    """Records the SQL statements executed while the fixture is active."""
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def stations(schedule, session):
+    """Six stations, each with one frequency and one Monday transmission at 0030."""
+    stations = []
+    for number in range(6):
+        station = Station(schedule=schedule, callsign=f"Station {number}", location="Test Location")
+        schedule.stations.append(station)
+        session.add(schedule)
+        session.commit()
+        frequency = Frequency(station=station, value=1000.0 + number)
+        station.frequencies.append(frequency)
+        transmission = Transmission(station=station, title=f"Title {number}", days=[DayOfWeek.Mon])
+        station.transmissions.append(transmission)
+        session.add(station)
+        session.commit()
+        frequency.times.append(TimeRange(frequency=frequency, start=time(0, 0), end=time(1, 0)))
+        transmission.times.append(TimeList(transmission=transmission, initial=time(0, 30)))
+        session.add(station)
+        session.commit()
+        stations.append(station)
+    return stations
+
+
 @pytest.fixture
 def runner(app):
     """A test runner for the app's Click commands."""
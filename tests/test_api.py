@@ -0,0 +1,60 @@
+import json
+
+import pytest
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import BadRequest
+
+from hermes.api import StreamEncoder, filter_args, next_page_headers, page_bounds
+
+CONFIG = {"API_PAGE_SIZE": 100, "API_MAX_PAGE_SIZE": 1000}
+
+
+class Row:
+    def __init__(self, id):
+        self.id = id
+
+
+@pytest.mark.parametrize(
+    "batches, expected",
+    [([], "[]"), ([[1]], "[1]"), ([[1, 2], [3]], "[1,2,3]")],
+)
+def test_stream_encoder_json(batches, expected):
+    encoder = StreamEncoder(json.dumps, ndjson=False)
+    assert "".join(encoder.batch(batch) for batch in batches) + encoder.end() == expected
+    assert encoder.mimetype == "application/json"
+
+
+def test_stream_encoder_ndjson():
+    encoder = StreamEncoder(json.dumps, ndjson=True)
+    assert encoder.batch([{"a": 1}, 2]) + encoder.batch([3]) + encoder.end() == '{"a": 1}\n2\n3\n'
+    assert encoder.mimetype == "application/x-ndjson"
+
+
+def test_page_bounds():
+    assert page_bounds(MultiDict(), CONFIG, ndjson=False) == (0, 100)
+    assert page_bounds(MultiDict({"after": "4", "limit": "100000"}), CONFIG, False) == (4, 1000)
+    assert page_bounds(MultiDict({"after": "4", "stream": "1"}), CONFIG, False) == (4, None)
+    # a bad limit does not matter when everything is streamed
+    assert page_bounds(MultiDict({"limit": "0"}), CONFIG, ndjson=True) == (0, None)
+    with pytest.raises(BadRequest, match="Limit must be positive"):
+        page_bounds(MultiDict({"limit": "0"}), CONFIG, ndjson=False)
+
+
+def test_next_page_headers():
+    rows = [Row(2), Row(5), Row(9)]
+    args = MultiDict([("day", "Mon"), ("day", "Sun"), ("limit", "2")])
+    assert next_page_headers("/api/transmissions", args, rows, 2) == {
+        "Link": '</api/transmissions?day=Mon&day=Sun&limit=2&after=5>; rel="next"',
+        "X-Next-Cursor": "5",
+    }
+    assert next_page_headers("/api/transmissions", args, rows, 3) == {}
+
+
+def test_filter_args():
+    dtr, station_ids = filter_args(
+        {"start_day": "Mon", "start_time": "2300", "end_time": "0100", "station_ids": ["1", 2]}
+    )
+    assert station_ids == [1, 2]
+    assert (dtr.start_time.hour, dtr.end_time.hour) == (23, 1)
+    with pytest.raises(BadRequest, match="Station ids must be integers"):
+        filter_args({"start_day": "Mon", "start_time": "2300", "end_time": "0100", "station_ids": ["one"]})
@@ -0,0 +1,142 @@
+from pathlib import Path
+
+import pytest
+from starlette.testclient import TestClient
+
+from hermes import create_app
+from hermes.asgi import async_database_uri, create_asgi_app
+from hermes.enum import EmissionType
+from hermes.extensions import db
+from hermes.models import MapArea, Station
+
+SAMPLE = Path(__file__).resolve().parent / "test_commands" / "arrl.json"
+
+
+@pytest.fixture
+def flask_app(tmp_path):
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'hermes.sqlite'}"})
+    with app.app_context():
+        db.create_all()
+        result = app.test_cli_runner().invoke(args=["load-schedule", str(SAMPLE)])
+        assert result.exit_code == 0, result.output
+        station = db.session.get(Station, 1)
+        station.emissions = [EmissionType.A1A]
+        db.session.add(MapArea(station, "1", "Somewhere"))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def asgi_client(flask_app):
+    with TestClient(create_asgi_app(flask_app)) as client:
+        yield client
+
+
+def assert_same(flask_response, asgi_response):
+    assert asgi_response.status_code == flask_response.status_code
+    assert asgi_response.text == flask_response.text
+    for header in ("Content-Type", "ETag", "Vary", "Link", "X-Next-Cursor"):
+        assert asgi_response.headers.get(header) == flask_response.headers.get(header), header
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/stations/1",
+        "/stations/2",
+        "/api/schedules",
+        "/api/schedules/1",
+        "/api/schedules/9",
+        "/api/stations",
+        "/api/stations?emission=A1A",
+        "/api/stations?emission=Nope",
+        "/api/stations/1",
+        "/api/stations/9",
+        "/api/frequencies?limit=4",
+        "/api/frequencies?limit=4&after=4",
+        "/api/frequencies?limit=0",
+        "/api/frequencies/1",
+        "/api/frequencies/99",
+        "/api/frequencies?emission=A1A",
+        "/api/transmissions?day=Mon&emission=A1A",
+        "/api/transmissions?stream=1",
+        "/api/transmissions/1",
+        "/api/transmissions/999",
+        "/api/map_areas",
+        "/api/map_areas?stream=1",
+        "/api/map_areas/1",
+        "/api/now?lookahead=10080",
+        "/api/now?lookahead=-1",
+    ],
+)
+def test_get_matches_flask(flask_app, asgi_client, url):
+    # asynchronously first, so it builds what the two share
+    asgi_response = asgi_client.get(url)
+    assert_same(flask_app.test_client().get(url), asgi_response)
+
+
+def test_conditional_and_streamed(flask_app, asgi_client):
+    flask_client = flask_app.test_client()
+    etag = asgi_client.get("/api/stations").headers["ETag"]
+    assert_same(
+        flask_client.get("/api/stations", headers={"If-None-Match": etag}),
+        asgi_client.get("/api/stations", headers={"If-None-Match": etag}),
+    )
+    headers = {"Accept": "application/x-ndjson"}
+    assert_same(
+        flask_client.get("/api/frequencies", headers=headers), asgi_client.get("/api/frequencies", headers=headers)
+    )
+
+
+def test_filter_matches_flask(flask_app, asgi_client):
+    flask_client = flask_app.test_client()
+    post_data = {"start_day": "Mon", "start_time": "2300", "end_time": "0100", "station_ids": [1]}
+    assert_same(flask_client.post("/filter", json=post_data), asgi_client.post("/filter", json=post_data))
+    # the second one is served from the cache both share
+    assert_same(flask_client.post("/filter", json=post_data), asgi_client.post("/filter", json=post_data))
+    assert asgi_client.get("/api/cache").json()["filter"]["hits"] == 3
+
+
+def test_filter_compiled(flask_app, asgi_client, tmp_path):
+    path = tmp_path / "hermes.schedule"
+    with flask_app.app_context():
+        result = flask_app.test_cli_runner().invoke(args=["compile-schedules", "--output", str(path)])
+        assert result.exit_code == 0, result.output
+    post_data = {"start_day": "Mon", "start_time": "2300", "end_time": "0100", "station_ids": [1]}
+    expected = asgi_client.post("/filter", json=post_data).json()
+    flask_app.config["COMPILED_SCHEDULE"] = str(path)
+    flask_app.extensions["hermes.filter_cache"].entries.clear()
+    assert asgi_client.post("/filter", json=post_data).json() == expected
+    assert "hermes.compiled_schedule" in flask_app.extensions
+
+
+def test_filter_compiled_string_ids(flask_app, asgi_client, tmp_path):
+    path = tmp_path / "hermes.schedule"
+    with flask_app.app_context():
+        result = flask_app.test_cli_runner().invoke(args=["compile-schedules", "--output", str(path)])
+        assert result.exit_code == 0, result.output
+    # as the page sends them
+    post_data = {"start_day": "Mon", "start_time": "2300", "end_time": "0100", "station_ids": ["1"]}
+    expected = asgi_client.post("/filter", json=post_data).json()
+    assert expected
+    flask_app.config["COMPILED_SCHEDULE"] = str(path)
+    flask_app.extensions["hermes.filter_cache"].entries.clear()
+    assert asgi_client.post("/filter", json=post_data).json() == expected
+    post_data["station_ids"] = ["one"]
+    assert_same(flask_app.test_client().post("/filter", json=post_data), asgi_client.post("/filter", json=post_data))
+
+
+def test_everything_else_goes_to_flask(asgi_client):
+    assert asgi_client.get("/").status_code == 200
+    response = asgi_client.post("/api/schedules", json={"name": "other", "date": "2024-11-21"})
+    assert response.status_code == 201
+    assert [schedule["name"] for schedule in asgi_client.get("/api/schedules").json()] == ["arrl", "other"]
+
+
+def test_async_database_uri(tmp_path):
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'hermes.sqlite'}"})
+    assert str(async_database_uri(app)) == f"sqlite+aiosqlite:///{tmp_path / 'hermes.sqlite'}"
+    app.config["ASYNC_DATABASE_URI"] = "postgresql+asyncpg://localhost/hermes"
+    assert async_database_uri(app) == "postgresql+asyncpg://localhost/hermes"
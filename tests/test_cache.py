@@ -0,0 +1,45 @@
+from hermes.cache import ResultCache
+
+
+def test_result_cache_hit_and_miss():
+    cache = ResultCache(max_size=2, ttl=60)
+    assert cache.get("a", 1) is None
+    cache.put("a", 1, [1])
+    assert cache.get("a", 1) == [1]
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "expirations": 0, "size": 1, "max_size": 2}
+
+
+def test_result_cache_evicts_least_recently_used():
+    cache = ResultCache(max_size=2, ttl=60)
+    cache.put("a", 1, "A")
+    cache.put("b", 1, "B")
+    assert cache.get("a", 1) == "A"
+    cache.put("c", 1, "C")
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == "A"
+    assert cache.get("c", 1) == "C"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_result_cache_expires_on_ttl_and_version():
+    now = [0.0]
+    cache = ResultCache(max_size=2, ttl=10, clock=lambda: now[0])
+    cache.put("a", 1, "A")
+    now[0] = 10.0
+    assert cache.get("a", 1) == "A"
+    now[0] = 10.5
+    assert cache.get("a", 1) is None
+    cache.put("a", 1, "A")
+    assert cache.get("a", 2) is None
+    stats = cache.stats()
+    assert stats["expirations"] == 2
+    assert stats["size"] == 0
+
+
+def test_result_cache_reports_lookups():
+    lookups = []
+    cache = ResultCache(max_size=2, ttl=60, on_lookup=lookups.append)
+    cache.get("a", 1)
+    cache.put("a", 1, "A")
+    cache.get("a", 1)
+    assert lookups == [False, True]
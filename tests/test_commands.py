@@ -1,7 +1,11 @@
+import io
 import json
 
 from hermes import create_app
-from hermes.extensions import db
+from hermes.commands import read_schedule_header
+from hermes.extensions import db, migrate
+from hermes.filter import CompiledSchedule
+from hermes.models import Schedule, get_data_version
 from hermes.schemas import schedule as schedule_schema
 
 
@@ -19,6 +23,8 @@ def test_load_schedule_command(
     runner, app, fs, schedule, station, frequency, timerange, transmission, timelist, map_area
 ):
     file_path = "composite.json"
+    # init-db stamps the database with the newest migration
+    fs.add_real_directory(Path(migrate.directory))
     fs.create_file(file_path, contents=json.dumps(schedule_schema.dump(schedule)))
     with app.app_context():
         try:
@@ -37,6 +43,79 @@ def test_load_schedule_command(
 from pathlib import Path
 
 
+def test_load_schedule_bulk_command(runner, app):
+    schedule_path = Path(__file__).resolve().parent / "test_commands" / "arrl.json"
+    dumps = []
+    for args in (
+        ["load-schedule", str(schedule_path)],
+        ["load-schedule", "--bulk", str(schedule_path)],
+        ["load-schedule", "--stream", str(schedule_path)],
+    ):
+        with app.app_context():
+            result = runner.invoke(args=["init-db", "--drop"])
+            assert result.exit_code == 0
+            result = runner.invoke(args=args)
+            assert result.exit_code == 0, result.output
+            assert "Schedule 'arrl' loaded successfully." in result.output
+            dumps.append(schedule_schema.dump(db.session.get(Schedule, 1)))
+            assert get_data_version() > 0
+            db.session.remove()
+    assert "  times: " in result.output
+    assert "  station: 1 rows in " in result.output
+    assert dumps[0] == dumps[1] == dumps[2]
+
+
+def test_load_schedule_stream_command(runner, app, tmp_path, schedule, stations):
+    expected = schedule_schema.dump(schedule)
+    file_path = tmp_path / "stations.json"
+    # stations first, so the header has to be found after them
+    file_path.write_text(json.dumps({"stations": expected["stations"], **expected}))
+    with app.app_context():
+        result = runner.invoke(args=["init-db", "--drop"])
+        assert result.exit_code == 0
+        result = runner.invoke(args=["load-schedule", "--stream", "--batch-size", "4", str(file_path)])
+        assert result.exit_code == 0, result.output
+        assert "Schedule 'Test Schedule' loaded successfully." in result.output
+        assert "  station: 6 rows in " in result.output
+        assert schedule_schema.dump(db.session.get(Schedule, 1)) == expected
+
+
+def test_read_schedule_header():
+    stations = [{"callsign": "X", "frequencies": [{"value": 1.0}]}]
+    header = {"name": "test", "date": "2024-11-20", "stations": stations, "source_url": "http://example.com/"}
+    assert read_schedule_header(io.BytesIO(json.dumps(header).encode())) == {
+        "name": "test",
+        "date": "2024-11-20",
+        "source_url": "http://example.com/",
+    }
+    del header["source_url"]
+    assert read_schedule_header(io.BytesIO(json.dumps(header).encode())) == {"name": "test", "date": "2024-11-20"}
+
+
+def test_load_schedule_many_files(runner, app, tmp_path):
+    arrl_path = str(Path(__file__).resolve().parent / "test_commands" / "arrl.json")
+    bad_path = tmp_path / "bad.json"
+    bad_path.write_text(json.dumps({"date": "2024-11-20", "stations": []}))
+    other_path = tmp_path / "other.json"
+    other_path.write_text(json.dumps({"name": "other", "date": "2024-11-20", "stations": [{"callsign": "X"}]}))
+    empty_path = tmp_path / "empty.json"
+    empty_path.write_text(json.dumps({"name": "empty", "date": "2024-11-20"}))
+    with app.app_context():
+        result = runner.invoke(
+            args=["load-schedule", "--jobs", "2", arrl_path, str(bad_path), str(other_path), str(empty_path)]
+        )
+        assert result.exit_code == 0, result.output
+        assert f"{arrl_path}: loaded 'arrl' (1 stations), parsed in " in result.output
+        assert f"{bad_path}: failed: KeyError: 'name'" in result.output
+        assert f"{other_path}: failed: KeyError: 'location'" in result.output
+        assert f"{empty_path}: loaded 'empty' (0 stations)" in result.output
+        assert "Loaded 2 of 4 files." in result.output
+        assert [schedule.name for schedule in db.session.query(Schedule).order_by(Schedule.name)] == ["arrl", "empty"]
+        result = runner.invoke(args=["load-schedule", "--stream", arrl_path, str(bad_path)])
+        assert result.exit_code == 2
+        assert "--stream loads a single file." in result.output
+
+
 def test_make_arrl_schedule(runner):
     data_path = Path(__file__).resolve().parent / "test_commands"
     bulletin_path = data_path / "arlb006.txt"
@@ -58,3 +137,52 @@ def test_make_wefax_schedule(runner):
     result = runner.invoke(args=["make-wefax-schedule", *data_files])
     assert result.exit_code == 0, result.output
     assert result.output == expected_output
+
+
+def test_compile_schedules_command(runner, app, tmp_path, stations):
+    path = tmp_path / "hermes.schedule"
+    with app.app_context():
+        result = runner.invoke(args=["compile-schedules"])
+        assert result.exit_code == 2
+        assert "Pass --output or set COMPILED_SCHEDULE." in result.output
+        result = runner.invoke(args=["compile-schedules", "--output", str(path)])
+        assert result.exit_code == 0, result.output
+        assert f"Compiled 6 events into {path} in " in result.output
+    assert len(CompiledSchedule(path)) == 6
+
+
+def test_generate_schedule_command(runner, app, tmp_path):
+    schedule_path = tmp_path / "synthetic.json"
+    args = ["generate-schedule", "--stations", "12", "--seed", "7", "--output", str(schedule_path)]
+    result = runner.invoke(args=args)
+    assert result.exit_code == 0, result.output
+    generated = json.loads(schedule_path.read_text())
+    assert len(generated["stations"]) == 12
+    assert runner.invoke(args=args[:-2]).output == schedule_path.read_text()
+    assert runner.invoke(args=["generate-schedule", "--stations", "12", "--seed", "8"]).output != result.output
+    time_ranges = [
+        time_range
+        for station in generated["stations"]
+        for frequency in station["frequencies"]
+        for time_range in frequency["times"]
+    ]
+    assert any(time_range["start"] > time_range["end"] for time_range in time_ranges)
+    timelists = [
+        timelist
+        for station in generated["stations"]
+        for transmission in station["transmissions"]
+        for timelist in transmission["times"]
+    ]
+    assert any("valid" in timelist for timelist in timelists)
+    assert any("rebroadcast" in timelist for timelist in timelists)
+
+    dumps = []
+    for options in ([], ["--bulk"], ["--stream"]):
+        with app.app_context():
+            runner.invoke(args=["init-db", "--drop"])
+            result = runner.invoke(args=["load-schedule", *options, str(schedule_path)])
+            assert "Schedule 'synthetic' loaded successfully." in result.output
+            dumps.append(schedule_schema.dump(db.session.get(Schedule, 1)))
+            db.session.remove()
+    assert dumps[0] == dumps[1] == dumps[2]
+    assert len(dumps[0]["stations"]) == 12
@@ -1,6 +1,7 @@
+from sqlalchemy import Column
 from sqlalchemy.dialects.sqlite import dialect
 
-from hermes.enum import DayOfWeek, EmissionType, Enums
+from hermes.enum import DayOfWeek, EmissionType, Enums, EnumSet
 
 
 def test_enums_process_bind_params():
@@ -31,3 +32,19 @@ def test_enums_process_result_value_none():
     enums = Enums(EmissionType)
     result = enums.process_result_value(None, dialect)
     assert result is None
+
+
+def test_enum_set_round_trip():
+    enum_set = EnumSet(DayOfWeek)
+    assert enum_set.process_bind_param([DayOfWeek.Mon, "Sun", DayOfWeek.Mon], dialect) == 0b11
+    assert enum_set.process_result_value(0b1000001, dialect) == [DayOfWeek.Sun, DayOfWeek.Sat]
+    assert enum_set.process_result_value(0, dialect) == []
+    assert enum_set.process_bind_param(None, dialect) is None
+    assert enum_set.process_result_value(None, dialect) is None
+
+
+def test_enum_set_intersects():
+    column = Column("days", EnumSet(DayOfWeek))
+    expression = column.intersects([DayOfWeek.Mon, DayOfWeek.Wed])
+    compiled = expression.compile(dialect=dialect(), compile_kwargs={"literal_binds": True})
+    assert str(compiled) == "(days & 10) != 0"
@@ -1,10 +1,64 @@
 import json
+import logging
+from datetime import date
+
+import pytest
+from sqlalchemy import create_mock_engine
 
 from hermes import create_app
-from hermes.extensions import db
+from hermes.extensions import SQLITE_PRAGMAS, db, engine_options, sqlite_pragmas, tune_sqlite
 from hermes.schemas import schedule as schedule_schema
 
 
 def test_config():
     assert not create_app().testing
     assert create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory"}).testing
+
+
+def test_orjson_provider():
+    app = create_app({"TESTING": True})
+    assert app.json.loads(app.json.dumps({"b": 1, "a": [date(2024, 11, 20)]})) == {
+        "a": ["Wed, 20 Nov 2024 00:00:00 GMT"],
+        "b": 1,
+    }
+    assert app.json.dumps({"b": 1, "a": 2}, sort_keys=False) == '{"b":1,"a":2}'
+    assert app.json.dumps([1], indent=2) == "[\n  1\n]"
+
+
+def test_sqlite_tuning(tmp_path, caplog):
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'hermes.sqlite'}",
+            "SQLITE_CACHE_SIZE": "-2048",
+            "SQLITE_TEMP_STORE": "",
+            "DATABASE_POOL_SIZE": "3",
+            "DATABASE_POOL_PRE_PING": True,
+        }
+    )
+    with app.app_context(), caplog.at_level(logging.INFO, logger="hermes.extensions"):
+        assert db.engine.pool.size() == 3
+        for _ in range(2):
+            with db.engine.connect() as connection:
+                settings = {name: connection.exec_driver_sql(f"PRAGMA {name}").scalar() for name in SQLITE_PRAGMAS}
+        db.engine.dispose()
+    assert settings == {
+        "journal_mode": "wal",
+        "synchronous": 1,
+        "cache_size": -2048,
+        "mmap_size": 256 * 1024 * 1024,
+        "busy_timeout": 5000,
+        "temp_store": 0,
+    }
+    (message,) = [record.getMessage() for record in caplog.records if record.name == "hermes.extensions"]
+    assert message.startswith("SQLite ")
+    assert "journal_mode=wal, synchronous=1, cache_size=-2048" in message
+    assert message.endswith("pool QueuePool(size=3)")
+
+
+def test_sqlite_tuning_settings():
+    assert engine_options({"DATABASE_POOL_RECYCLE": "3600", "DATABASE_POOL_TIMEOUT": ""}) == {"pool_recycle": 3600}
+    with pytest.raises(ValueError, match="SQLITE_JOURNAL_MODE"):
+        sqlite_pragmas({"SQLITE_JOURNAL_MODE": "WAL; DROP TABLE station"})
+    # other databases are left alone; listening on this mock engine would raise
+    tune_sqlite(create_mock_engine("postgresql://", executor=None), {"journal_mode": "WAL"})
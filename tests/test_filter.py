@@ -1,9 +1,27 @@
 from datetime import time
+from pathlib import Path
 from pprint import pprint
 
+import pytest
+
+from hermes.commands import insert_schedule, insert_stations, parse_schedule_file
 from hermes.enum import DayOfWeek, EmissionType
-from hermes.filter import DateTimeRange, get_emissions, get_events
-from hermes.models import Frequency, TimeList, Transmission
+from hermes.filter import (
+    MINUTES_PER_WEEK,
+    CompiledSchedule,
+    DateTimeRange,
+    Event,
+    EventIndex,
+    FrequencyIndex,
+    get_emissions,
+    get_events,
+    get_events_many,
+    load_stations,
+    make_event,
+    minute_of_week,
+    query_events,
+)
+from hermes.models import Frequency, TimeList, TimeRange, Transmission
 
 
 def test_in_range_same_day():
@@ -34,6 +52,34 @@ def test_in_range_exact_boundary():
     assert dtr.in_range(DayOfWeek.Fri, time(18, 1)) is False
 
 
+def test_minute_of_week():
+    assert minute_of_week(DayOfWeek.Sun, time(0, 0)) == 0
+    assert minute_of_week(DayOfWeek.Mon, time(1, 30)) == 1440 + 90
+    assert minute_of_week(DayOfWeek.Sat, time(23, 59)) == MINUTES_PER_WEEK - 1
+
+
+def test_windows():
+    assert DateTimeRange(DayOfWeek.Mon, time(10, 0), time(18, 0)).windows() == [(2040, 2520)]
+    assert DateTimeRange(DayOfWeek.Mon, time(22, 0), time(6, 0)).windows() == [(2760, 3240)]
+    assert DateTimeRange(DayOfWeek.Sat, time(23, 30), time(1, 30)).windows() == [(0, 90), (10050, 10079)]
+    assert DateTimeRange(DayOfWeek.Sat, time(12, 0), time(12, 0)).windows() == [(0, 720), (9360, 10079)]
+
+
+def test_windows_match_in_range():
+    checks = [(day, time(hour, minute)) for day in DayOfWeek for hour in range(24) for minute in (0, 29, 59)]
+    for dtr in [
+        DateTimeRange(DayOfWeek.Mon, time(10, 0), time(18, 0)),
+        DateTimeRange(DayOfWeek.Fri, time(22, 0), time(6, 0)),
+        DateTimeRange(DayOfWeek.Sat, time(23, 30), time(1, 30)),
+        DateTimeRange(DayOfWeek.Sun, time(5, 0), time(5, 0)),
+    ]:
+        windows = dtr.windows()
+        for day, check_time in checks:
+            minute = minute_of_week(day, check_time)
+            expected = dtr.in_range(day, check_time)
+            assert any(low <= minute <= high for low, high in windows) == expected, (dtr.day, day, check_time)
+
+
 def test_get_emissions(schedule, station, frequency, transmission, session):
     actual = get_emissions(station, transmission, [frequency])
     assert actual == transmission.emissions
@@ -78,3 +124,146 @@ def test_get_events_no_timerange(schedule, station, frequency, transmission, map
     events = get_events(dtr, [station])
     assert isinstance(events, list)
     assert len(events) == 1
+
+
+def test_event_index_matches_scan(schedule, station, frequency, transmission, timelist, timerange, session):
+    other = Transmission(station=station, title="Other", days=[DayOfWeek.Sat, DayOfWeek.Sun])
+    station.transmissions.append(other)
+    session.add(station)
+    session.commit()
+    for initial in [time(0, 0), time(0, 30), time(12, 0), time(23, 45)]:
+        other.times.append(TimeList(transmission=other, initial=initial))
+    session.add(other)
+    session.commit()
+
+    index = EventIndex([station])
+    assert len(index) == 2 + 2 * 4
+    for dtr in [
+        DateTimeRange(DayOfWeek.Mon, time(0, 0), time(1, 0)),
+        DateTimeRange(DayOfWeek.Sat, time(23, 0), time(0, 30)),
+        DateTimeRange(DayOfWeek.Sun, time(0, 0), time(0, 0)),
+        DateTimeRange(DayOfWeek.Wed, time(0, 0), time(23, 59)),
+    ]:
+        expected = [
+            make_event(station, t, day, timelist, station.get_frequencies_at_time(timelist.initial))
+            for t in station.transmissions
+            for day in t.days
+            for timelist in t.times
+            if dtr.in_range(day, timelist.initial)
+        ]
+        expected.sort(key=Event.sort_key)
+        actual = index.query(dtr)
+        assert [(e.day, e.time, e.name) for e in actual] == [(e.day, e.time, e.name) for e in expected]
+
+
+def test_frequency_index_matches_scan(schedule, station, frequency, timerange, session):
+    for value, ranges in [
+        (200.0, []),
+        (300.0, [(time(23, 0), time(2, 0)), (time(12, 0), time(12, 0))]),
+        (400.0, [(time(0, 30), time(6, 0)), (time(5, 0), time(13, 0))]),
+    ]:
+        other = Frequency(station=station, value=value)
+        station.frequencies.append(other)
+        session.add(station)
+        session.commit()
+        for start, end in ranges:
+            other.times.append(TimeRange(frequency=other, start=start, end=end))
+        session.add(other)
+        session.commit()
+
+    index = FrequencyIndex(station)
+    for hour in range(24):
+        for minute in range(0, 60, 15):
+            reference_time = time(hour, minute)
+            assert index.at_time(reference_time) == station.get_frequencies_at_time(reference_time), reference_time
+    assert index.at_time(time(23, 59, 59)) == station.get_frequencies_at_time(time(23, 59, 59))
+
+
+def test_event_index_memoizes_frequencies(stations):
+    index = EventIndex(stations)
+    dtr = DateTimeRange(DayOfWeek.Mon, time(0, 0), time(1, 0))
+    first = index.query(dtr)
+    assert len(index.frequency_indices) == len(stations)
+    assert len(index.frequencies_at) == len(stations)
+    second = index.query(dtr)
+    assert [event.frequencies for event in first] == [event.frequencies for event in second]
+    assert len(index.frequencies_at) == len(stations)
+
+
+def test_load_stations_query_count(stations, session, statements):
+    station_ids = [station.id for station in stations]
+    dtr = DateTimeRange(DayOfWeek.Mon, time(0, 0), time(1, 0))
+    counts = []
+    for count in (1, 3, 6):
+        session.expunge_all()
+        statements.clear()
+        events = get_events(dtr, load_stations(station_ids[:count]))
+        assert len(events) == count
+        assert all(event.frequencies for event in events)
+        counts.append(len(statements))
+    assert counts == [counts[0]] * 3
+
+
+def test_query_many_matches_query(stations, transmission, timelist):
+    dtrs = [DateTimeRange(day, time(hour, 0), time((hour + 1) % 24, 0)) for day in DayOfWeek for hour in range(24)]
+    index = EventIndex([*stations, transmission.station])
+    positions = index.positions(dtrs)
+    assert len(positions) == 7 * 24
+    assert sum(len(matches) for matches in positions) == len(stations) + 2
+    grid = index.query_many(dtrs)
+    for dtr, events in zip(dtrs, grid, strict=True):
+        assert [(e.day, e.time, e.name) for e in events] == [(e.day, e.time, e.name) for e in index.query(dtr)]
+    assert get_events_many([], stations) == []
+    assert [len(events) for events in get_events_many(dtrs[24:26], stations)] == [len(stations), 0]
+
+
+def test_query_events_matches_get_events(session):
+    schedule, stations, _ = parse_schedule_file(str(Path(__file__).resolve().parent / "test_commands" / "arrl.json"))
+    insert_stations(insert_schedule(schedule, {}), stations, {})
+    session.commit()
+    dtrs = [
+        DateTimeRange(day, time(start), time(end))
+        for day in DayOfWeek
+        for start, end in [(0, 6), (13, 13), (20, 2), (23, 1), (12, 0)]
+    ]
+    for dtr in dtrs:
+        expected = [event.to_dict() for event in get_events(dtr, load_stations())]
+        assert [event.to_dict() for event in query_events(dtr)] == expected
+        assert [event.to_dict() for event in query_events(dtr, [1])] == expected
+        assert query_events(dtr, [2]) == []
+    assert sum(len(get_events(dtr, load_stations())) for dtr in dtrs) > 0
+
+
+def test_query_events_uses_index(session, statements):
+    query_events(DateTimeRange(DayOfWeek.Mon, time(0, 0), time(1, 0)))
+    (statement,) = [statement for statement in statements if "FROM times" in statement]
+    parameters = ("00:00:00.000000",) * statement.count("?")
+    plan = session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    assert any("ix_times_initial_transmission_id" in row[-1] for row in plan)
+
+
+def test_compiled_schedule_matches_get_events(session, tmp_path):
+    schedule, stations, _ = parse_schedule_file(str(Path(__file__).resolve().parent / "test_commands" / "arrl.json"))
+    insert_stations(insert_schedule(schedule, {}), stations, {})
+    session.commit()
+    path = tmp_path / "hermes.schedule"
+    count = CompiledSchedule.write(path, load_stations(), 42)
+    compiled = CompiledSchedule(path)
+    assert len(compiled) == count == len(EventIndex(load_stations()))
+    assert compiled.data_version == 42
+    for day in DayOfWeek:
+        for start, end in [(0, 6), (13, 13), (20, 2), (23, 1), (12, 0)]:
+            dtr = DateTimeRange(day, time(start), time(end))
+            expected = [event.to_dict() for event in get_events(dtr, load_stations())]
+            assert [event.to_dict() for event in compiled.query(dtr)] == expected
+            assert [event.to_dict() for event in compiled.query(dtr, [1, 99])] == expected
+            assert compiled.query(dtr, [99]) == []
+
+
+def test_compiled_schedule_empty_and_invalid(session, tmp_path):
+    path = tmp_path / "hermes.schedule"
+    assert CompiledSchedule.write(path, [], 0) == 0
+    assert CompiledSchedule(path).query(DateTimeRange(DayOfWeek.Sat, time(23, 0), time(1, 0))) == []
+    path.write_bytes(b"\0" * CompiledSchedule.header.size)
+    with pytest.raises(ValueError, match="is not a version 1 compiled schedule"):
+        CompiledSchedule(path)
@@ -0,0 +1,131 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from prometheus_client import REGISTRY
+
+from hermes import create_app
+from hermes.extensions import db
+from hermes.metrics import MULTIPROCESS_DIR, mark_process_dead, reset_multiprocess_dir
+
+SCHEDULE = Path(__file__).resolve().parent / "test_commands" / "arrl.json"
+WORKER = """
+from hermes import create_app
+from hermes.extensions import db
+from hermes.extensions import db
+
+app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "METRICS_ENABLED": True})
+with app.app_context():
+    db.create_all()
+app.test_client().get("/api/stations").close()
+"""
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_request_metrics(client, station):
+    labels = {"method": "GET", "endpoint": "api.get_stations", "status": "200"}
+    requests = sample("hermes_request_duration_seconds_count", **labels)
+    statements = sample("hermes_request_sql_statements_sum", endpoint="api.get_stations")
+    sql = sample("hermes_sql_duration_seconds_count", endpoint="api.get_stations")
+    sizes = sample("hermes_response_size_bytes_sum", endpoint="api.get_stations")
+    response = client.get("/api/stations")
+    response.close()
+    assert sample("hermes_request_duration_seconds_count", **labels) == requests + 1
+    assert sample("hermes_request_sql_statements_sum", endpoint="api.get_stations") > statements
+    assert sample("hermes_sql_duration_seconds_count", endpoint="api.get_stations") > sql
+    assert sample("hermes_response_size_bytes_sum", endpoint="api.get_stations") == sizes + len(response.data)
+    unmatched = sample("hermes_request_duration_seconds_count", method="GET", endpoint="unmatched", status="404")
+    client.get("/nowhere").close()
+    assert sample("hermes_request_duration_seconds_count", method="GET", endpoint="unmatched", status="404") == (
+        unmatched + 1
+    )
+
+
+def test_streamed_response_counted_on_close(client, station, frequency):
+    labels = {"method": "GET", "endpoint": "api.get_frequencies", "status": "200"}
+    requests = sample("hermes_request_duration_seconds_count", **labels)
+    sizes = sample("hermes_response_size_bytes_count", endpoint="api.get_frequencies")
+    response = client.get("/api/frequencies", headers={"Accept": "application/x-ndjson"})
+    assert sample("hermes_request_duration_seconds_count", **labels) == requests
+    response.get_data()
+    response.close()
+    assert sample("hermes_request_duration_seconds_count", **labels) == requests + 1
+    # the length of a streamed body is not known up front
+    assert sample("hermes_response_size_bytes_count", endpoint="api.get_frequencies") == sizes
+
+
+def test_cache_lookups(client, stations):
+    hits = sample("hermes_cache_lookups_total", cache="filter", result="hit")
+    misses = sample("hermes_cache_lookups_total", cache="filter", result="miss")
+    post_data = {"start_day": "Mon", "start_time": "0000", "end_time": "0100", "station_ids": [1]}
+    client.post("/filter", json=post_data)
+    client.post("/filter", json=post_data)
+    assert sample("hermes_cache_lookups_total", cache="filter", result="hit") == hits + 1
+    assert sample("hermes_cache_lookups_total", cache="filter", result="miss") == misses + 1
+    timeline_misses = sample("hermes_cache_lookups_total", cache="timeline", result="miss")
+    client.get("/api/now")
+    client.get("/api/now")
+    assert sample("hermes_cache_lookups_total", cache="timeline", result="miss") == timeline_misses + 1
+
+
+def test_metrics_endpoint(client):
+    client.get("/api/cache").close()
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    assert b'hermes_request_duration_seconds_count{endpoint="api.get_cache_stats",method="GET",status="200"}' in (
+        response.data
+    )
+    client.get("/metrics")
+    assert b'endpoint="metrics"' not in client.get("/metrics").data
+
+
+def test_metrics_disabled():
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"})
+    assert app.test_client().get("/metrics").status_code == 404
+
+
+def test_statements_outside_requests_not_counted(app):
+    sql = sample("hermes_sql_duration_seconds_count", endpoint="none")
+    db.session.execute(db.text("SELECT 1"))
+    assert sample("hermes_sql_duration_seconds_count", endpoint="none") == sql
+
+
+def test_commands_create_multiprocess_dir(tmp_path):
+    # as in the Docker image, where every process sees the variable but only `flask serve` empties the directory
+    directory = tmp_path / "metrics"
+    env = {
+        **os.environ,
+        MULTIPROCESS_DIR: str(directory),
+        "METRICS_ENABLED": "1",
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'hermes.sqlite'}",
+    }
+    compiled = tmp_path / "compiled"
+    for command in (["init-db"], ["load-schedule", str(SCHEDULE)], ["compile-schedules", "--output", str(compiled)]):
+        subprocess.run([sys.executable, "-m", "flask", "--app", "hermes", *command], env=env, check=True)
+    assert directory.is_dir()
+
+
+def test_multiprocess_metrics(client, tmp_path, monkeypatch):
+    # two worker processes, each writing its values into the shared directory
+    env = {**os.environ, MULTIPROCESS_DIR: str(tmp_path)}
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", WORKER], env=env, check=True)
+    assert len(list(tmp_path.glob("*.db"))) >= 2
+    monkeypatch.setenv(MULTIPROCESS_DIR, str(tmp_path))
+    data = client.get("/metrics").data.decode()
+    assert 'hermes_request_duration_seconds_count{endpoint="api.get_stations",method="GET",status="200"} 2.0' in data
+    reset_multiprocess_dir()
+    assert list(tmp_path.glob("*.db")) == []
+    assert "hermes_request_duration_seconds_count" not in client.get("/metrics").data.decode()
+    mark_process_dead(os.getpid())
+
+
+def test_multiprocess_dir_unset(tmp_path, monkeypatch):
+    monkeypatch.delenv(MULTIPROCESS_DIR, raising=False)
+    reset_multiprocess_dir()
+    mark_process_dead(os.getpid())
@@ -0,0 +1,141 @@
+import json
+from pathlib import Path
+
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask_migrate import downgrade, stamp, upgrade
+from sqlalchemy import inspect, select, text
+
+from hermes import create_app
+from hermes.enum import DayOfWeek, EmissionType
+from hermes.extensions import db
+from hermes.models import Station, Transmission
+
+INITIAL = "015a47394616"
+BITMASKS = "49395f2cb366"
+BASELINE = Path(__file__).resolve().parent / "test_migrations" / "baseline.sql"
+ARRL = Path(__file__).resolve().parent / "test_commands" / "arrl.json"
+
+# (query, plan before the index migration, plan after it)
+PLANS = [
+    (
+        "SELECT * FROM station WHERE schedule_id IN (1, 2)",
+        "SEARCH station USING INDEX sqlite_autoindex_station_1 (schedule_id=?)",
+        "SEARCH station USING INDEX sqlite_autoindex_station_1 (schedule_id=?)",
+    ),
+    (
+        "SELECT * FROM frequency WHERE station_id IN (1, 2)",
+        "SEARCH frequency USING INDEX sqlite_autoindex_frequency_1 (station_id=?)",
+        "SEARCH frequency USING INDEX sqlite_autoindex_frequency_1 (station_id=?)",
+    ),
+    (
+        "SELECT * FROM time_range WHERE frequency_id IN (1, 2)",
+        "SCAN time_range",
+        "SEARCH time_range USING INDEX ix_time_range_frequency_id (frequency_id=?)",
+    ),
+    (
+        "SELECT * FROM transmission WHERE station_id IN (1, 2)",
+        "SCAN transmission",
+        "SEARCH transmission USING INDEX ix_transmission_station_id (station_id=?)",
+    ),
+    (
+        "SELECT * FROM times WHERE transmission_id IN (1, 2)",
+        "SCAN times",
+        "SEARCH times USING INDEX ix_times_transmission_id (transmission_id=?)",
+    ),
+    (
+        "SELECT * FROM times WHERE initial BETWEEN '00:00:00.000000' AND '01:00:00.000000'",
+        "SCAN times",
+        "SEARCH times USING INDEX ix_times_initial_transmission_id (initial>? AND initial<?)",
+    ),
+]
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'hermes.sqlite'}"})
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def query_plan(query: str) -> list[str]:
+    return [row[-1] for row in db.session.execute(text(f"EXPLAIN QUERY PLAN {query}"))]
+
+
+def test_migrations_match_models(file_app):
+    upgrade()
+    with db.engine.connect() as connection:
+        assert compare_metadata(MigrationContext.configure(connection), db.metadata) == []
+    downgrade(revision="base")
+    assert inspect(db.engine).get_table_names() == ["alembic_version"]
+
+
+def test_init_db_stamps_newest_migration(file_app, runner):
+    result = runner.invoke(args=["init-db"])
+    assert result.exit_code == 0, result.output
+    with db.engine.connect() as connection:
+        assert MigrationContext.configure(connection).get_current_revision() is not None
+    upgrade()
+
+
+def test_bitmask_migration_converts_data(file_app):
+    upgrade(revision=INITIAL)
+    db.session.execute(text("INSERT INTO schedule (id, name, date) VALUES (1, 'old', '2024-11-20')"))
+    db.session.execute(
+        text("INSERT INTO station (id, schedule_id, callsign, location, emissions) VALUES (1, 1, 'X', 'Y', '[]')")
+    )
+    db.session.execute(
+        text(
+            "INSERT INTO transmission (id, station_id, title, emissions, days) "
+            """VALUES (1, 1, 'A', '["J3C", "A1A"]', '["Mon", "Sun"]'), (2, 1, 'B', '[]', '["Tue"]')"""
+        )
+    )
+    db.session.commit()
+    upgrade(revision=BITMASKS)
+    first, second = db.session.scalars(select(Transmission).order_by(Transmission.id))
+    assert first.emissions == [EmissionType.A1A, EmissionType.J3C]
+    assert first.days == [DayOfWeek.Sun, DayOfWeek.Mon]
+    assert second.emissions == []
+    assert db.session.scalars(select(Transmission.title).where(Transmission.days.intersects(["Tue"]))).all() == ["B"]
+    assert db.session.get(Station, 1).emissions == []
+    db.session.remove()
+    downgrade(revision=INITIAL)
+    rows = db.session.execute(text("SELECT emissions, days FROM transmission ORDER BY id")).all()
+    assert [(json.loads(emissions), json.loads(days)) for emissions, days in rows] == [
+        (["A1A", "J3C"], ["Sun", "Mon"]),
+        ([], ["Tue"]),
+    ]
+
+
+def test_index_migration_query_plans(file_app):
+    upgrade(revision=BITMASKS)
+    assert [query_plan(query) for query, _, _ in PLANS] == [[before] for _, before, _ in PLANS]
+    db.session.remove()
+    upgrade()
+    assert [query_plan(query) for query, _, _ in PLANS] == [[after] for _, _, after in PLANS]
+
+
+def test_upgrade_database_from_before_migrations(file_app):
+    connection = db.engine.raw_connection()
+    connection.executescript(BASELINE.read_text())
+    connection.executescript(
+        """
+        INSERT INTO schedule (id, name, date) VALUES (1, 'old', '2024-11-20');
+        INSERT INTO station (id, schedule_id, callsign, location, emissions) VALUES (1, 1, 'X', 'Y', '["A1A"]');
+        INSERT INTO transmission (id, station_id, title, emissions, days) VALUES (1, 1, 'A', '[]', '["Mon"]');
+        INSERT INTO times (id, transmission_id, initial) VALUES (1, 1, '00:30:00.000000');
+        """
+    )
+    connection.close()
+    stamp(revision=INITIAL)
+    upgrade()
+    client = file_app.test_client()
+    assert [station["callsign"] for station in client.get("/api/stations").get_json()] == ["X"]
+    post_data = {"start_day": "Mon", "start_time": "0000", "end_time": "0100", "station_ids": [1]}
+    assert [event["name"] for event in client.post("/filter", json=post_data).get_json()] == ["A (A1A)"]
+    result = file_app.test_cli_runner().invoke(args=["load-schedule", str(ARRL)])
+    assert result.exit_code == 0, result.output
+    assert len(client.get("/api/schedules").get_json()) == 2
@@ -0,0 +1,69 @@
+-- The schema `flask init-db` created before migrations existed, as dumped from SQLite.
+CREATE TABLE schedule (
+	id INTEGER NOT NULL,
+	name VARCHAR NOT NULL,
+	date DATE NOT NULL,
+	source_url VARCHAR,
+	CONSTRAINT pk_schedule PRIMARY KEY (id),
+	CONSTRAINT unique_name_date UNIQUE (name, date)
+);
+CREATE TABLE station (
+	id INTEGER NOT NULL,
+	schedule_id INTEGER NOT NULL,
+	callsign VARCHAR NOT NULL,
+	location VARCHAR NOT NULL,
+	region VARCHAR,
+	emissions TEXT NOT NULL,
+	CONSTRAINT pk_station PRIMARY KEY (id),
+	CONSTRAINT unique_schedule_id_callsign UNIQUE (schedule_id, callsign),
+	CONSTRAINT fk_station_schedule_id_schedule FOREIGN KEY(schedule_id) REFERENCES schedule (id)
+);
+CREATE TABLE frequency (
+	id INTEGER NOT NULL,
+	station_id INTEGER NOT NULL,
+	value FLOAT NOT NULL,
+	callsign VARCHAR,
+	emissions TEXT NOT NULL,
+	power FLOAT,
+	CONSTRAINT pk_frequency PRIMARY KEY (id),
+	CONSTRAINT unique_station_id_value UNIQUE (station_id, value),
+	CONSTRAINT fk_frequency_station_id_station FOREIGN KEY(station_id) REFERENCES station (id)
+);
+CREATE TABLE map_area (
+	id INTEGER NOT NULL,
+	station_id INTEGER NOT NULL,
+	ident VARCHAR NOT NULL,
+	description VARCHAR NOT NULL,
+	CONSTRAINT pk_map_area PRIMARY KEY (id),
+	CONSTRAINT unique_station_id_ident UNIQUE (station_id, ident),
+	CONSTRAINT fk_map_area_station_id_station FOREIGN KEY(station_id) REFERENCES station (id)
+);
+CREATE TABLE transmission (
+	id INTEGER NOT NULL,
+	station_id INTEGER NOT NULL,
+	title VARCHAR NOT NULL,
+	emissions TEXT NOT NULL,
+	days TEXT NOT NULL,
+	map_area_id INTEGER,
+	CONSTRAINT pk_transmission PRIMARY KEY (id),
+	CONSTRAINT fk_transmission_map_area_id_map_area FOREIGN KEY(map_area_id, station_id) REFERENCES map_area (id, station_id),
+	CONSTRAINT fk_transmission_station_id_station FOREIGN KEY(station_id) REFERENCES station (id),
+	CONSTRAINT fk_transmission_map_area_id_map_area FOREIGN KEY(map_area_id) REFERENCES map_area (id)
+);
+CREATE TABLE time_range (
+	id INTEGER NOT NULL,
+	frequency_id INTEGER NOT NULL,
+	start TIME NOT NULL,
+	"end" TIME NOT NULL,
+	CONSTRAINT pk_time_range PRIMARY KEY (id),
+	CONSTRAINT fk_time_range_frequency_id_frequency FOREIGN KEY(frequency_id) REFERENCES frequency (id)
+);
+CREATE TABLE times (
+	id INTEGER NOT NULL,
+	transmission_id INTEGER NOT NULL,
+	initial TIME NOT NULL,
+	rebroadcast TIME,
+	valid TIME,
+	CONSTRAINT pk_times PRIMARY KEY (id),
+	CONSTRAINT fk_times_transmission_id_transmission FOREIGN KEY(transmission_id) REFERENCES transmission (id)
+);
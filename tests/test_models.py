@@ -1,7 +1,11 @@
 from datetime import time
 
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
 from hermes.enum import EmissionType
-from hermes.models import TimeRange, Transmission
+from hermes.models import DataVersion, Station, TimeRange, Transmission, get_data_version
 
 
 def test_schedule_creation(schedule):
@@ -70,3 +74,41 @@ def test_station_get_frequencies_cross_midnight(frequency, station, session):
     actual = station.get_frequencies_at_time(time(12, 30))
     assert isinstance(actual, list)
     assert len(actual) == 0
+
+
+def test_data_version(schedule, station, session):
+    version = get_data_version()
+    assert version > 0
+    station.callsign = "Changed"
+    session.commit()
+    assert get_data_version() == version + 1
+    session.commit()
+    assert get_data_version() == version + 1
+    assert version > 2**31
+    session.execute(update(Station).values(region="Elsewhere"))
+    session.rollback()
+    session.commit()
+    assert get_data_version() == version + 1
+
+
+def test_data_version_after_flush(schedule, station, session):
+    version = get_data_version()
+    station.callsign = "Flushed"
+    session.flush()
+    session.commit()
+    assert get_data_version() == version + 1
+    # a query flushes the change before the commit does
+    station.location = "Autoflushed"
+    assert session.scalars(select(Station).where(Station.location == "Autoflushed")).one() is station
+    session.commit()
+    assert get_data_version() == version + 2
+    session.add(Station(schedule=schedule, callsign="New", location="Pending"))
+    session.flush()
+    session.rollback()
+    session.commit()
+    assert get_data_version() == version + 2
+
+
+def test_data_version_fits_postgresql():
+    column = CreateTable(DataVersion.__table__).compile(dialect=postgresql.dialect())
+    assert "version BIGINT NOT NULL" in str(column)
@@ -0,0 +1,108 @@
+import logging
+from datetime import time
+
+import pytest
+from flask import jsonify
+
+from hermes import create_app
+from hermes.enum import DayOfWeek
+from hermes.extensions import db
+from hermes.models import Frequency, MapArea, Station, TimeList, TimeRange, Transmission
+from hermes.queries import NPlusOneError
+
+
+@pytest.fixture
+def crowded(app, stations, session):
+    """The six stations, each given enough frequencies, transmissions and map areas for a per-child query to show."""
+    extra = app.config["QUERY_DETECTOR_THRESHOLD"]
+    for station in stations:
+        for number in range(extra):
+            frequency = Frequency(station=station, value=2000.0 + number)
+            frequency.times.append(TimeRange(frequency=frequency, start=time(number), end=time(number + 1)))
+            transmission = Transmission(station=station, title=f"Extra {number}", days=[DayOfWeek.Tue])
+            transmission.times.append(TimeList(transmission=transmission, initial=time(number, 15)))
+            station.frequencies.append(frequency)
+            station.transmissions.append(transmission)
+            station.map_areas.append(MapArea(station=station, ident=str(number), description=f"Area {number}"))
+    session.commit()
+    session.expire_all()
+    return stations
+
+
+@pytest.fixture
+def lazy_route(app):
+    """A route that loads each station's frequencies one station at a time."""
+
+    def frequencies():
+        stations = db.session.scalars(db.select(Station)).all()
+        return jsonify({station.callsign: len(station.frequencies) for station in stations})
+
+    app.add_url_rule("/lazy", "lazy", frequencies)
+    return "/lazy"
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/",
+        "/stations/1",
+        "/api/schedules",
+        "/api/schedules/1",
+        "/api/stations",
+        "/api/stations/1",
+        "/api/frequencies",
+        "/api/frequencies/1",
+        "/api/transmissions",
+        "/api/transmissions/1",
+        "/api/map_areas",
+        "/api/map_areas/1",
+        "/api/now?lookahead=10080",
+    ],
+)
+def test_routes_have_no_repeated_queries(client, crowded, url):
+    # the app fixture raises on repeats, so this fails on any new per-row query
+    assert client.get(url).status_code == 200
+
+
+def test_filter_has_no_repeated_queries(client, crowded):
+    post_data = {"start_day": "Tue", "start_time": "0000", "end_time": "0300", "station_ids": [1, 2, 3, 4, 5, 6]}
+    assert len(client.post("/filter", json=post_data).get_json()) == 18
+
+
+def test_repeated_queries_raise(client, stations, lazy_route):
+    db.session.expire_all()
+    with pytest.raises(NPlusOneError) as excinfo:
+        client.get(lazy_route)
+    message = str(excinfo.value)
+    assert message.startswith("GET /lazy ran 7 statements, repeating 1:")
+    assert "6 x SELECT frequency." in message
+    assert f"6 from {__file__}:" in message
+    assert "in <dictcomp>" in message
+
+
+def test_repeated_queries_logged(app, client, stations, lazy_route, caplog):
+    app.config["QUERY_DETECTOR"] = "log"
+    db.session.expire_all()
+    with caplog.at_level(logging.WARNING, logger="hermes.queries"):
+        assert client.get(lazy_route).status_code == 200
+    assert "GET /lazy ran 7 statements" in caplog.text
+
+
+def test_below_threshold(app, client, stations, lazy_route):
+    app.config["QUERY_DETECTOR_THRESHOLD"] = 7
+    db.session.expire_all()
+    assert client.get(lazy_route).status_code == 200
+
+
+def test_same_parameters_not_reported(app, client, stations):
+    def first_station():
+        callsigns = [db.session.get(Station, 1, populate_existing=True).callsign for _ in range(6)]
+        return jsonify(callsigns)
+
+    app.add_url_rule("/same", "same", first_station)
+    assert client.get("/same").get_json() == ["Station 0"] * 6
+
+
+def test_invalid_mode():
+    with pytest.raises(ValueError, match="QUERY_DETECTOR must be one of log, raise"):
+        create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "QUERY_DETECTOR": "shout"})
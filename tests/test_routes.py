@@ -1,4 +1,7 @@
 import json
+import logging
+
+from hermes.extensions import db
 
 
 def test_index(client, schedule, station, frequency, transmission):
@@ -28,6 +31,107 @@ def test_filter_schedule(client, schedule, station, frequency, transmission, tim
     assert len(response_data) == 1
 
 
+def test_filter_schedule_query_count(client, stations, statements):
+    counts = []
+    for count in (1, 6):
+        statements.clear()
+        post_data = {
+            "start_day": "Mon",
+            "start_time": "0000",
+            "end_time": "0100",
+            "station_ids": list(range(1, count + 1)),
+        }
+        response = client.post("/filter", json=post_data)
+        assert response.status_code == 200
+        assert len(response.get_json()) == count
+        counts.append(len(statements))
+    assert counts[0] == counts[1]
+
+
+def test_filter_schedule_compiled(app, client, stations, runner, tmp_path):
+    post_data = {"start_day": "Mon", "start_time": "0000", "end_time": "0100", "station_ids": [1, 2]}
+    expected = client.post("/filter", json=post_data).get_json()
+    app.config["COMPILED_SCHEDULE"] = str(tmp_path / "hermes.schedule")
+    assert runner.invoke(args=["compile-schedules"]).exit_code == 0
+    assert client.post("/filter", json=post_data).get_json() == expected
+    compiled = app.extensions["hermes.compiled_schedule"][1]
+    post_data["station_ids"] = [3]
+    assert len(client.post("/filter", json=post_data).get_json()) == 1
+    assert app.extensions["hermes.compiled_schedule"][1] is compiled
+    # the file is only read again once it is replaced
+    stations[2].callsign = "Renamed"
+    db.session.commit()
+    assert client.post("/filter", json=post_data).get_json()[0]["station"] == "Station 2 (Test Location)"
+    assert runner.invoke(args=["compile-schedules"]).exit_code == 0
+    assert client.post("/filter", json=post_data).get_json()[0]["station"] == "Renamed (Test Location)"
+
+
+def test_filter_schedule_compiled_string_ids(app, client, stations, runner, tmp_path):
+    # as the page sends them
+    post_data = {"start_day": "Mon", "start_time": "0000", "end_time": "0100", "station_ids": ["1", "2"]}
+    expected = client.post("/filter", json=post_data).get_json()
+    assert len(expected) == 2
+    app.config.update(COMPILED_SCHEDULE=str(tmp_path / "hermes.schedule"), FILTER_CACHE_SIZE=0)
+    app.extensions["hermes.filter_cache"].entries.clear()
+    assert runner.invoke(args=["compile-schedules"]).exit_code == 0
+    assert client.post("/filter", json=post_data).get_json() == expected
+    post_data["station_ids"] = [1, 2]
+    assert client.post("/filter", json=post_data).get_json() == expected
+    post_data["station_ids"] = ["one"]
+    assert client.post("/filter", json=post_data).status_code == 400
+
+
+def test_filter_schedule_compiled_missing(app, client, stations, runner, tmp_path, caplog):
+    post_data = {"start_day": "Mon", "start_time": "0000", "end_time": "0100", "station_ids": [1, 2]}
+    expected = client.post("/filter", json=post_data).get_json()
+    path = tmp_path / "hermes.schedule"
+    app.config.update(COMPILED_SCHEDULE=str(path), FILTER_CACHE_SIZE=0)
+    app.extensions["hermes.filter_cache"].entries.clear()
+    with caplog.at_level(logging.WARNING, logger="hermes.routes"):
+        assert client.post("/filter", json=post_data).get_json() == expected
+        assert client.post("/filter", json=post_data).get_json() == expected
+    assert caplog.text.count("Answering /filter from the database") == 1
+    path.write_bytes(b"not a compiled schedule")
+    assert client.post("/filter", json=post_data).get_json() == expected
+    assert runner.invoke(args=["compile-schedules"]).exit_code == 0
+    assert client.post("/filter", json=post_data).get_json() == expected
+    assert "hermes.compiled_schedule_error" not in app.extensions
+    assert "hermes.compiled_schedule" in app.extensions
+
+
+def test_filter_schedule_cache(client, stations):
+    post_data = {"start_day": "Mon", "start_time": "0000", "end_time": "0100", "station_ids": [1, 2]}
+    first = client.post("/filter", json=post_data).get_json()
+    assert len(first) == 2
+    post_data["station_ids"] = [2, 1]
+    assert client.post("/filter", json=post_data).get_json() == first
+    assert client.get("/api/cache").get_json()["filter"]["hits"] == 1
+    response = client.post("/api/transmissions", json={"station_id": 1, "title": "New", "days": ["Mon"]})
+    assert response.status_code == 201
+    client.post("/filter", json=post_data)
+    stats = client.get("/api/cache").get_json()["filter"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["expirations"] == 1
+
+
+def test_get_now(client, stations, monkeypatch):
+    monkeypatch.setattr("hermes.routes.current_minute", lambda: 1440 + 30)
+    response = client.get("/api/now")
+    assert response.status_code == 200
+    assert len(response.get_json()) == 6
+    response = client.get("/api/now?station_ids=1&station_ids=3")
+    assert [event["station"] for event in response.get_json()] == [
+        "Station 0 (Test Location)",
+        "Station 2 (Test Location)",
+    ]
+    monkeypatch.setattr("hermes.routes.current_minute", lambda: 1440)
+    assert client.get("/api/now").get_json() == []
+    assert len(client.get("/api/now?lookahead=30").get_json()) == 6
+    response = client.get("/api/now?lookahead=-1")
+    assert response.status_code == 400
+
+
 def test_get_schedules(client, schedule):
     response = client.get("/api/schedules")
     assert response.status_code == 200
@@ -37,6 +141,27 @@ def test_get_schedules(client, schedule):
     assert json_data[0]["name"] == "Test Schedule"
 
 
+def test_get_collections_conditional(client, schedule, station, frequency, transmission, map_area, statements):
+    for name in ["schedules", "stations", "frequencies", "transmissions", "map_areas"]:
+        response = client.get(f"/api/{name}")
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        assert not etag.startswith("W/")
+        statements.clear()
+        response = client.get(f"/api/{name}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.data == b""
+        assert response.headers["ETag"] == etag
+        assert len(statements) == 1
+        response = client.get(f"/api/{name}", headers={"If-None-Match": '"stale"'})
+        assert response.status_code == 200
+    response = client.post("/api/map_areas", json={"station_id": 1, "ident": "2", "description": "Second"})
+    assert response.status_code == 201
+    response = client.get("/api/map_areas", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
 def test_get_schedule(client, schedule):
     response = client.get("/api/schedules/1")
     assert response.status_code == 200
@@ -78,6 +203,47 @@ def test_get_stations(client, schedule, station):
     assert json_data[0]["callsign"] == "Test Station"
 
 
+def test_get_stations_paginated(app, client, stations, statements):
+    response = client.get("/api/stations?limit=4")
+    assert response.status_code == 200
+    assert [station["callsign"] for station in response.get_json()] == [f"Station {number}" for number in range(4)]
+    assert response.headers["X-Next-Cursor"] == "4"
+    assert response.headers["Link"] == '</api/stations?limit=4&after=4>; rel="next"'
+    statements.clear()
+    response = client.get("/api/stations?limit=4&after=4")
+    assert [station["callsign"] for station in response.get_json()] == ["Station 4", "Station 5"]
+    assert "Link" not in response.headers
+    assert "X-Next-Cursor" not in response.headers
+    page_statements = len(statements)
+    statements.clear()
+    client.get("/api/stations?limit=4")
+    assert len(statements) == page_statements
+    app.config["API_PAGE_SIZE"] = 5
+    app.config["API_MAX_PAGE_SIZE"] = 3
+    response = client.get("/api/stations")
+    assert len(response.get_json()) == 3
+    assert response.headers["X-Next-Cursor"] == "3"
+    response = client.get("/api/stations?limit=0")
+    assert response.status_code == 400
+
+
+def test_get_stations_streamed(app, client, stations):
+    app.config["API_STREAM_BATCH_SIZE"] = 4
+    expected = client.get("/api/stations").get_json()
+    response = client.get("/api/stations?stream=1&limit=2")
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "application/json"
+    assert json.loads(response.data) == expected
+    response = client.get("/api/stations?after=4", headers={"Accept": "application/x-ndjson"})
+    assert response.mimetype == "application/x-ndjson"
+    assert [json.loads(line) for line in response.data.decode().splitlines()] == expected[4:]
+    assert response.headers["ETag"] != client.get("/api/stations").headers["ETag"]
+    assert "Accept" in response.headers["Vary"]
+    response = client.get("/api/map_areas?stream=1")
+    assert json.loads(response.data) == []
+
+
 def test_get_station(client, schedule, station):
     response = client.get("/api/stations/1")
     assert response.status_code == 200
@@ -172,6 +338,21 @@ def test_get_transmissions(client, schedule, station, transmission):
     assert json_data[0]["title"] == "Test Title"
 
 
+def test_get_transmissions_filtered(client, stations, transmission):
+    response = client.get("/api/transmissions?day=Tue")
+    assert [item["title"] for item in response.get_json()] == ["Test Title"]
+    response = client.get("/api/transmissions?day=Mon&day=Sun&limit=4")
+    assert len(response.get_json()) == 4
+    assert response.headers["Link"] == '</api/transmissions?day=Mon&day=Sun&limit=4&after=4>; rel="next"'
+    assert client.get("/api/transmissions?emission=A1A&day=Mon").get_json()[0]["title"] == "Test Title"
+    assert client.get("/api/transmissions?emission=J3C").get_json() == []
+    assert client.get("/api/stations?emission=A1A").get_json() == []
+    assert len(client.get("/api/frequencies?emission=A1A&emission=J3E").get_json()) == 0
+    response = client.get("/api/transmissions?day=Someday")
+    assert response.status_code == 400
+    assert b"Unknown day &#39;Someday&#39;" in response.data
+
+
 def test_get_transmission(client, schedule, station, transmission, timelist):
     response = client.get("/api/transmissions/1")
     assert response.status_code == 200
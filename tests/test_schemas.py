@@ -1,4 +1,10 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from marshmallow import Schema, fields
+
 from hermes import schemas
+from hermes.enum import DayOfWeek
 
 
 def test_schedule(schedule):
@@ -24,3 +30,27 @@ def test_transmission(transmission):
 def test_map_area(map_area):
     actual = schemas.map_area.dump(map_area)
     assert actual["ident"] == "ID"
+
+
+def test_serializers_match_schemas(schedule, station, frequency, timerange, map_area, transmission, timelist):
+    for name, obj in [
+        ("schedule", schedule),
+        ("station", station),
+        ("frequency", frequency),
+        ("transmission", transmission),
+        ("map_area", map_area),
+    ]:
+        schema = getattr(schemas, name)
+        assert getattr(schemas, f"{name}_serializer").dump(obj) == schema.dump(obj)
+    assert schemas.schedules_serializer.dump([schedule]) == schemas.schedules.dump([schedule])
+
+
+def test_serializer_field_fallbacks():
+    class Sample(Schema):
+        flag = fields.Boolean()
+        day = fields.Enum(DayOfWeek, by_value=True)
+        stamp = fields.DateTime("iso", data_key="when")
+        missing = fields.String()
+
+    sample = SimpleNamespace(flag=1, day=DayOfWeek.Mon, stamp=datetime(2024, 11, 20, 12, 30), missing=None)
+    assert schemas.Serializer(Sample()).dump(sample) == Sample().dump(sample)
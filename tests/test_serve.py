@@ -0,0 +1,94 @@
+import gc
+import logging
+import signal
+from types import SimpleNamespace
+
+import pytest
+from flask import current_app
+from sqlalchemy.exc import OperationalError
+
+from hermes import create_app
+from hermes.extensions import db
+from hermes.serve import HermesApplication, gunicorn_options, warm_caches, worker_count
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'hermes.sqlite'}"})
+    with app.app_context():
+        db.create_all()
+    yield app
+    gc.unfreeze()
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_worker_count(monkeypatch):
+    monkeypatch.setattr("os.cpu_count", lambda: 4)
+    assert worker_count({"SERVE_WORKERS": None}) == 9
+    assert worker_count({"SERVE_WORKERS": "3"}) == 3
+
+
+def test_gunicorn_options(file_app):
+    file_app.config.update(SERVE_WORKERS="3", SERVE_BIND="127.0.0.1:9000", SERVE_THREADS=2)
+    options = gunicorn_options(file_app)
+    assert (options["bind"], options["workers"], options["threads"]) == ("127.0.0.1:9000", 3, 2)
+    assert options["preload_app"] is True
+    assert options["max_requests"] == file_app.config["SERVE_MAX_REQUESTS"]
+    options = gunicorn_options(file_app, "unix:/tmp/hermes.sock", 5, 1)
+    assert (options["bind"], options["workers"], options["threads"]) == ("unix:/tmp/hermes.sock", 5, 1)
+    application = HermesApplication(file_app, options)
+    assert application.cfg.workers == 5
+    assert application.cfg.preload_app is True
+    assert application.load() is file_app
+
+
+def test_warm_caches(file_app, tmp_path, caplog, monkeypatch):
+    warm_caches(file_app)
+    assert "hermes.timeline" in file_app.extensions
+    assert gc.get_freeze_count() > 0
+    file_app.config["COMPILED_SCHEDULE"] = str(tmp_path / "missing.schedule")
+
+    def get_timeline():
+        raise OperationalError("SELECT", {}, Exception("disk I/O error"))
+
+    monkeypatch.setattr("hermes.timeline.get_timeline", get_timeline)
+    with caplog.at_level(logging.WARNING):
+        warm_caches(file_app)
+    assert "Starting with cold caches" in caplog.text
+
+
+def test_post_worker_init_restores_reload_signal(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'hermes.sqlite'}"
+    with create_app({"SQLALCHEMY_DATABASE_URI": uri}).app_context():
+        db.create_all()
+    app = create_app({"SQLALCHEMY_DATABASE_URI": uri, "READ_ONLY_SNAPSHOT": True})
+    snapshot = app.extensions["hermes.snapshot"]
+    try:
+        # as gunicorn leaves it in a new worker
+        signal.signal(signal.SIGUSR2, signal.SIG_DFL)
+        gunicorn_options(app)["post_worker_init"](None)
+        assert signal.getsignal(signal.SIGUSR2) == snapshot.request_reload
+    finally:
+        signal.signal(signal.SIGUSR2, signal.SIG_DFL)
+
+
+def test_child_exit_marks_worker_dead(file_app, monkeypatch):
+    dead = []
+    monkeypatch.setattr("hermes.serve.mark_process_dead", dead.append)
+    gunicorn_options(file_app)["child_exit"](None, SimpleNamespace(pid=1234))
+    assert dead == [1234]
+
+
+def test_serve_command(file_app, monkeypatch):
+    served = {}
+
+    def run(application):
+        served["workers"] = application.cfg.workers
+        served["in_app_context"] = bool(current_app)
+
+    monkeypatch.setattr(HermesApplication, "run", run)
+    result = file_app.test_cli_runner().invoke(args=["serve", "--workers", "2", "--bind", "127.0.0.1:9000"])
+    assert result.exit_code == 0, result.output
+    assert "Serving on 127.0.0.1:9000 with 2 workers of 2 threads." in result.output
+    assert served == {"workers": 2, "in_app_context": False}
@@ -0,0 +1,150 @@
+import logging
+import os
+import signal
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from hermes import create_app
+from hermes.extensions import db
+from hermes.models import Schedule, Station
+
+
+@pytest.fixture
+def database(tmp_path):
+    """A database file holding one schedule, and the app that writes to it."""
+    uri = f"sqlite:///{tmp_path / 'hermes.sqlite'}"
+    writer = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": uri})
+    with writer.app_context():
+        db.create_all()
+        db.session.add(Schedule(name="Test Schedule", date=date(2024, 11, 20)))
+        db.session.commit()
+    add_station(writer, "Station 1")
+    yield writer
+    with writer.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def snapshot_app(database):
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": database.config["SQLALCHEMY_DATABASE_URI"],
+            "READ_ONLY_SNAPSHOT": True,
+            "SNAPSHOT_CHECK_INTERVAL": 0,
+        }
+    )
+    yield app
+    signal.signal(signal.SIGUSR2, signal.SIG_DFL)
+    with app.app_context():
+        db.engine.dispose()
+
+
+def add_station(app, callsign):
+    with app.app_context():
+        schedule = db.session.get(Schedule, 1)
+        db.session.add(Station(schedule, callsign, "Somewhere"))
+        db.session.commit()
+
+
+def test_snapshot_serves_reads(snapshot_app):
+    client = snapshot_app.test_client()
+    assert [station["callsign"] for station in client.get("/api/stations").get_json()] == ["Station 1"]
+    assert client.get("/").status_code == 200
+    post_data = {"start_day": "Mon", "start_time": "0000", "end_time": "0100", "station_ids": [1]}
+    assert client.post("/filter", json=post_data).get_json() == []
+    with pytest.raises(OperationalError, match="readonly"):
+        add_station(snapshot_app, "Station 2")
+
+
+def test_snapshot_refuses_writes(snapshot_app):
+    client = snapshot_app.test_client()
+    response = client.post("/api/stations", json={"schedule_id": 1, "callsign": "X", "location": "Y"})
+    assert response.status_code == 503
+    assert client.delete("/api/stations/1").status_code == 503
+    assert client.get("/api/stations/1").status_code == 200
+
+
+def test_snapshot_reloads_on_file_change(database, snapshot_app):
+    client = snapshot_app.test_client()
+    snapshot = snapshot_app.extensions["hermes.snapshot"]
+    assert len(client.get("/api/stations").get_json()) == 1
+    first_uri = snapshot.uri
+    add_station(database, "Station 2")
+    # make the change visible even on filesystems with coarse timestamps
+    os.utime(snapshot.path, (snapshot.source_mtime + 1, snapshot.source_mtime + 1))
+    assert len(client.get("/api/stations").get_json()) == 2
+    assert snapshot.uri != first_uri
+    snapshot.check_interval = 3600
+    add_station(database, "Station 3")
+    os.utime(snapshot.path, (snapshot.source_mtime + 2, snapshot.source_mtime + 2))
+    assert len(client.get("/api/stations").get_json()) == 2
+
+
+def test_snapshot_reloads_on_signal(database, snapshot_app):
+    client = snapshot_app.test_client()
+    snapshot = snapshot_app.extensions["hermes.snapshot"]
+    snapshot.check_interval = 3600
+    assert len(client.get("/api/stations").get_json()) == 1
+    add_station(database, "Station 2")
+    assert len(client.get("/api/stations").get_json()) == 1
+    os.kill(os.getpid(), signal.SIGUSR2)
+    assert snapshot.reload_requested
+    assert len(client.get("/api/stations").get_json()) == 2
+    assert not snapshot.reload_requested
+
+
+def test_snapshot_kept_while_file_missing(database, snapshot_app, caplog):
+    client = snapshot_app.test_client()
+    snapshot = snapshot_app.extensions["hermes.snapshot"]
+    assert len(client.get("/api/stations").get_json()) == 1
+    first_uri = snapshot.uri
+    moved = snapshot.path.with_name("moved.sqlite")
+    snapshot.path.rename(moved)
+    with caplog.at_level(logging.WARNING, logger="hermes.snapshot"):
+        assert len(client.get("/api/stations").get_json()) == 1
+        os.kill(os.getpid(), signal.SIGUSR2)
+        assert len(client.get("/api/stations").get_json()) == 1
+    assert caplog.text.count("is missing") == 1
+    assert snapshot.uri == first_uri
+    assert not snapshot.reload_requested
+    # swapped back in, changed
+    moved.rename(snapshot.path)
+    add_station(database, "Station 2")
+    os.utime(snapshot.path, (snapshot.source_mtime + 1, snapshot.source_mtime + 1))
+    assert len(client.get("/api/stations").get_json()) == 2
+    assert not snapshot.missing
+
+
+def test_snapshot_reloads_after_fork(snapshot_app):
+    client = snapshot_app.test_client()
+    snapshot = snapshot_app.extensions["hermes.snapshot"]
+    assert len(client.get("/api/stations").get_json()) == 1
+    inherited = snapshot.holder
+    # pretend to be a worker forked after the copy was made
+    snapshot.pid = -1
+    assert len(client.get("/api/stations").get_json()) == 1
+    assert snapshot.pid == os.getpid()
+    inherited.close()
+
+
+def test_snapshot_outside_requests(database):
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": database.config["SQLALCHEMY_DATABASE_URI"],
+            "READ_ONLY_SNAPSHOT": True,
+            "SNAPSHOT_RELOAD_SIGNAL": "",
+        }
+    )
+    with app.app_context():
+        assert [station.callsign for station in db.session.scalars(select(Station))] == ["Station 1"]
+        db.engine.dispose()
+    assert signal.getsignal(signal.SIGUSR2) == signal.SIG_DFL
+
+
+def test_snapshot_needs_database_file():
+    with pytest.raises(ValueError, match="needs an SQLite database file"):
+        create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:", "READ_ONLY_SNAPSHOT": True})
@@ -0,0 +1,49 @@
+from datetime import time
+
+from hermes.enum import DayOfWeek
+from hermes.filter import MINUTES_PER_WEEK, minute_of_week
+from hermes.models import TimeList, Transmission
+from hermes.timeline import WeeklyTimeline, current_minute, get_timeline
+
+MONDAY_0030 = minute_of_week(DayOfWeek.Mon, time(0, 30))
+
+
+def test_current_minute():
+    assert 0 <= current_minute() < MINUTES_PER_WEEK
+
+
+def test_weekly_timeline_at(stations):
+    timeline = WeeklyTimeline(stations)
+    events = timeline.at(MONDAY_0030)
+    assert [event["name"] for event in events] == [f"Title {number}" for number in range(6)]
+    assert events[0] == {
+        "day": "Mon",
+        "time": "0030",
+        "name": "Title 0",
+        "station": "Station 0 (Test Location)",
+        "frequencies": [1000.0],
+    }
+    assert timeline.at(MONDAY_0030 - 1) == []
+    assert len(timeline.at(MONDAY_0030 - 30, lookahead=30)) == 6
+    assert len(timeline.at(MONDAY_0030, station_ids={stations[0].id, stations[2].id})) == 2
+
+
+def test_weekly_timeline_wraps_week(station, session):
+    transmission = Transmission(station=station, title="Sunday", days=[DayOfWeek.Sun])
+    station.transmissions.append(transmission)
+    session.add(station)
+    session.commit()
+    transmission.times.append(TimeList(transmission=transmission, initial=time(0, 1)))
+    session.add(transmission)
+    session.commit()
+    timeline = WeeklyTimeline([station])
+    assert [event["name"] for event in timeline.at(MINUTES_PER_WEEK - 1, lookahead=2)] == ["Sunday"]
+    assert len(timeline.at(0, lookahead=MINUTES_PER_WEEK * 2)) == 1
+
+
+def test_get_timeline_rebuilds_on_change(client, stations):
+    timeline = get_timeline()
+    assert get_timeline() is timeline
+    response = client.post("/api/transmissions", json={"station_id": stations[0].id, "title": "New"})
+    assert response.status_code == 201
+    assert get_timeline() is not timeline